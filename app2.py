@@ -1,11 +1,27 @@
 import streamlit as st
-import pickle
 import pandas as pd
-import numpy as np
 import time
+import os
 from datetime import datetime
-from fpdf import FPDF
 import io
+import uuid
+from inference import encode_symptom_lists, predict_proba, rank_predictions
+from batch_scoring import InputError, score_csv
+from model_bundle import DEFAULT_BUNDLE_PATH, BundleError
+from model_store import ModelStore
+from prediction_cache import DEFAULT_CACHE_SIZE, PredictionCache, symptom_bitset
+from metrics import DEFAULT_PORT, REGISTRY, start_metrics_server, timed
+from reports import DEFAULT_REPORT_CACHE_SIZE, ReportCache, report_key
+from symptom_recommender import recommend_symptoms
+from history_store import DEFAULT_HISTORY_PATH, HistoryStore
+from attribution import explain_selection
+
+RERUN_STARTED = time.perf_counter()
+BUNDLE_PATH = os.environ.get("DIAGNOX_BUNDLE_PATH", DEFAULT_BUNDLE_PATH)
+# Pause shown while "analyzing"; load benchmarks set it to 0 to time the app itself.
+ANALYZE_DELAY_SECONDS = float(os.environ.get("DIAGNOX_ANALYZE_DELAY", "1.5"))
+# Operator-only sidebar panels are hidden from visitors unless DIAGNOX_ADMIN=1.
+SHOW_ADMIN_PANELS = os.environ.get("DIAGNOX_ADMIN", "0").lower() in ("1", "true", "yes")
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -157,24 +173,146 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Data Loading & Processing ---
-@st.cache_data
+@st.cache_resource
 def load_data():
-    """Loads all necessary data files with error handling."""
+    """Loads the model bundle once per process and watches it for hot reloads."""
     try:
-        with open("disease_predictor.pkl", "rb") as f:
-            model = pickle.load(f)
-        medications_df = pd.read_csv("medications.csv")
-        train_df = pd.read_csv("Training.csv").drop(columns=["Unnamed: 133"], errors='ignore')
-        symptoms_list = sorted(train_df.drop("prognosis", axis=1).columns.tolist())
-        return model, medications_df, symptoms_list
+        with timed("load"):
+            store = ModelStore(BUNDLE_PATH)
+        store.start_watching()
+        return store
     except FileNotFoundError as e:
-        st.error(f"Fatal Error: A required file was not found: {e.filename}.")
+        st.error(f"Fatal Error: A required file was not found: {e.filename}. Run model_training.py to build it.")
+        st.stop()
+    except BundleError as e:
+        st.error(f"Fatal Error: Invalid model bundle: {e}")
         st.stop()
     except Exception as e:
         st.error(f"Fatal Error during data loading: {e}")
         st.stop()
 
-model, medications_df, symptoms_list = load_data()
+# One read-only snapshot per rerun; a hot reload only affects later reruns.
+model_snapshot = load_data().current()
+model = model_snapshot.model
+medications_index = model_snapshot.suggestions
+model_features = model_snapshot.features
+symptoms_list = model_snapshot.symptoms_list
+
+@st.cache_resource
+def get_prediction_cache():
+    """Returns the prediction cache shared by every session in this process."""
+    maxsize = int(os.environ.get("DIAGNOX_PREDICTION_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    return PredictionCache(maxsize=maxsize, model_path=BUNDLE_PATH)
+
+@st.cache_resource
+def get_metrics_server():
+    """Starts the /metrics endpoint once per process (only with DIAGNOX_METRICS=1)."""
+    if not REGISTRY.enabled:
+        return None
+    port = int(os.environ.get("DIAGNOX_METRICS_PORT", DEFAULT_PORT))
+    try:
+        return start_metrics_server(port)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+        return None
+
+get_metrics_server()
+
+@st.cache_resource
+def get_report_cache():
+    """Returns the rendered-PDF cache shared by every session in this process."""
+    maxsize = int(os.environ.get("DIAGNOX_REPORT_CACHE_SIZE", DEFAULT_REPORT_CACHE_SIZE))
+    return ReportCache(maxsize=maxsize)
+
+def render_pdf_report(results, key):
+    """Renders (or reuses) the PDF for one results object; timed as the pdf stage."""
+    with timed("pdf"):
+        return get_report_cache().get_or_render(results, key)
+
+@st.cache_resource
+def get_recommendation_cache():
+    """Memoizes next-symptom suggestions per symptom set, shared across sessions."""
+    maxsize = int(os.environ.get("DIAGNOX_PREDICTION_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    return PredictionCache(maxsize=maxsize, model_path=BUNDLE_PATH)
+
+@st.cache_resource
+def get_history_store():
+    """Returns the SQLite analysis log (and its write-behind thread) for this process."""
+    return HistoryStore(os.environ.get("DIAGNOX_HISTORY_PATH", DEFAULT_HISTORY_PATH))
+
+def log_analysis(results):
+    """Queues one analysis for the history log; never waits on disk."""
+    get_history_store().record(
+        st.session_state.session_id,
+        model_features,
+        symptom_bitset(results["selected_symptoms"], model_features),
+        results["severity"],
+        results["top_predictions"],
+    )
+    st.session_state.history_cursors = []
+
+def analyze_symptoms(selected_symptoms):
+    """Runs the model on one symptom selection, timing each stage."""
+    with timed("encode"):
+        X = encode_symptom_lists([selected_symptoms], model_features)
+    with timed("predict"):
+        proba = predict_proba(model, X)[0]
+    with timed("suggestions"):
+        return rank_predictions(proba, model.classes_, medications_index, k=3)
+
+def predict_cached(selected_symptoms):
+    """Top predictions for a symptom set; the same set is shared across sessions."""
+    cache_key = (model_snapshot.version, symptom_bitset(selected_symptoms, model_features))
+    return get_prediction_cache().get_or_compute(cache_key, lambda: analyze_symptoms(selected_symptoms))
+
+def recommend_next_symptoms(selected_symptoms):
+    """Unselected symptoms that would most sharpen the diagnosis, memoized per symptom set."""
+    cache_key = (model_snapshot.version, symptom_bitset(selected_symptoms, model_features))
+    with timed("recommend"):
+        return get_recommendation_cache().get_or_compute(
+            cache_key,
+            lambda: recommend_symptoms(model, model_features, selected_symptoms, model_snapshot.symptom_rates,
+                                       candidates=selectable_symptoms)
+        )
+
+@st.cache_resource
+def get_attribution_cache():
+    """Memoizes symptom attributions per symptom set, shared across sessions."""
+    maxsize = int(os.environ.get("DIAGNOX_PREDICTION_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    return PredictionCache(maxsize=maxsize, model_path=BUNDLE_PATH)
+
+def explain_predictions(selected_symptoms, top_predictions, model_version):
+    """Per-symptom breakdown of each top prediction's probability, keyed by disease.
+
+    Returns None when the predictions came from an earlier model version: the
+    current model may not know their diseases or may score them differently.
+    """
+    if model_version != model_snapshot.version:
+        return None
+    attributor = model_snapshot.attributor
+    if attributor is None:
+        return {}
+    class_ids = {disease: i for i, disease in enumerate(attributor.classes_)}
+    cache_key = (model_snapshot.version, symptom_bitset(selected_symptoms, model_features))
+    with timed("attribution"):
+        explanations = get_attribution_cache().get_or_compute(
+            cache_key,
+            lambda: explain_selection(attributor, model_features, selected_symptoms,
+                                      [class_ids[p['disease']] for p in top_predictions])
+        )
+    return {e['disease']: e for e in explanations}
+
+def add_symptom_to_results(symptom):
+    """Re-runs the analysis with one more symptom (button callback)."""
+    results = st.session_state.analysis_results
+    selected = results["selected_symptoms"] + [symptom]
+    st.session_state.analysis_results = {
+        **results,
+        "selected_symptoms": selected,
+        "top_predictions": [dict(p) for p in predict_cached(selected)],
+        "model_version": model_snapshot.version,
+    }
+    log_analysis(st.session_state.analysis_results)
 
 symptom_categories = {
     "General & Systemic": ['itching', 'chills', 'fatigue', 'lethargy', 'malaise', 'weight_loss', 'weight_gain', 'excessive_hunger', 'dehydration', 'sweating', 'fever'],
@@ -187,47 +325,23 @@ symptom_categories = {
     "Psychological & Mood": ['anxiety', 'mood_swings', 'depression', 'irritability', 'restlessness', 'lack_of_concentration', 'altered_sensorium', 'coma']
 }
 
+@st.cache_resource
+def category_options(model_version, _symptoms_list):
+    """Per-category symptoms the model knows; computed once per model version."""
+    known = set(_symptoms_list)
+    return {category: [s for s in symptoms if s in known] for category, symptoms in symptom_categories.items()}
+
+valid_symptoms_by_category = category_options(model_snapshot.version, symptoms_list)
+# Next-symptom suggestions are limited to what the form lets users pick.
+selectable_symptoms = [s for symptoms in valid_symptoms_by_category.values() for s in symptoms]
+
 # --- Initialize Session State ---
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
-if 'history' not in st.session_state: # NEW: For analysis history
-    st.session_state.history = []
-
-# --- PDF Generation Class ---
-class PDF(FPDF):
-    """PDF generation class for creating the final report."""
-    def __init__(self, name="User", age="N/A"): # NEW: Accept user details
-        super().__init__()
-        self.user_name = name
-        self.user_age = age
-
-    def header(self):
-        self.set_font('Arial', 'B', 15)
-        # NEW: Personalized title
-        self.cell(0, 10, f'DiagnoX AI Report for {self.user_name}', 0, 1, 'C')
-        self.ln(10)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
-        self.cell(0, 10, f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 0, 'R')
-
-    def chapter_title(self, title):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, title, 0, 1, 'L')
-        self.ln(4)
-
-    def chapter_body(self, body):
-        self.set_font('Arial', '', 11)
-        self.multi_cell(0, 5, body)
-        self.ln()
-
-    def add_diagnosis(self, diagnosis, probability):
-        self.set_font('Arial', 'B', 11)
-        self.cell(95, 8, f" {diagnosis}", 1, 0, 'L')
-        self.set_font('Arial', '', 11)
-        self.cell(95, 8, f"{probability*100:.2f}% Confidence", 1, 1, 'R')
+if 'session_id' not in st.session_state: # Keys this session's rows in the history log
+    st.session_state.session_id = uuid.uuid4().hex
+if 'history_cursors' not in st.session_state: # Keyset cursors of the history pages seen so far
+    st.session_state.history_cursors = []
 
 # --- UI Rendering Functions ---
 def render_header():
@@ -245,7 +359,9 @@ def render_input_form():
     st.markdown("<br>", unsafe_allow_html=True)
     main_cols = st.columns([1, 1.5, 1])
     with main_cols[1]:
-        with st.container():
+        # A form batches every input into one rerun on submit; picking symptoms
+        # or typing details no longer re-executes the whole script.
+        with st.form("symptom_form", border=False):
             st.markdown("<div class='card input-card'>", unsafe_allow_html=True)
             st.markdown("<h2>Symptom Analysis Engine</h2>", unsafe_allow_html=True)
 
@@ -261,9 +377,8 @@ def render_input_form():
 
             selected_symptoms = []
             st.markdown("<h6>Select the symptoms you are experiencing:</h6>", unsafe_allow_html=True)
-            for category, symptoms_in_category in symptom_categories.items():
+            for category, valid_symptoms in valid_symptoms_by_category.items():
                 with st.expander(f"**{category}**"):
-                    valid_symptoms = [s for s in symptoms_in_category if s in symptoms_list]
                     selections = st.multiselect(f"Select from {category}", options=valid_symptoms, label_visibility="collapsed")
                     selected_symptoms.extend(selections)
             
@@ -273,7 +388,7 @@ def render_input_form():
             severity = st.select_slider("Severity", options=['Mild', 'Moderate', 'Severe'], value='Moderate', label_visibility="collapsed")
 
             st.write("")
-            if st.button("Analyze Symptoms", use_container_width=True):
+            if st.form_submit_button("Analyze Symptoms", use_container_width=True):
                 # NEW: Validation for user details
                 if not user_name or user_age <= 0:
                     st.warning("⚠️ Please enter a valid name and age.")
@@ -283,43 +398,23 @@ def render_input_form():
                 else:
                     with st.spinner(''):
                         st.markdown("""<div style="text-align:center; color:var(--primary-gold);">DIAGNOX AI IS ANALYZING...</div>""", unsafe_allow_html=True)
-                        time.sleep(1.5)
-
-                    input_data = [0] * len(symptoms_list)
-                    for symptom in selected_symptoms:
-                        if symptom in symptoms_list:
-                            input_data[symptoms_list.index(symptom)] = 1
-                    input_data = np.array(input_data).reshape(1, -1)
+                        with timed("analyzing_delay"):
+                            time.sleep(ANALYZE_DELAY_SECONDS)
 
                     try:
-                        prediction_proba = model.predict_proba(input_data)[0]
-                        top3_indices = np.argsort(prediction_proba)[-3:][::-1]
-                        
+                        top_predictions_list = predict_cached(selected_symptoms)
+
                         results = {
                             "user_name": user_name, # NEW
                             "user_age": user_age,   # NEW
                             "selected_symptoms": selected_symptoms,
                             "severity": severity,
-                            "top_predictions": []
+                            "top_predictions": [dict(p) for p in top_predictions_list],
+                            "model_version": model_snapshot.version,
                         }
 
-                        for i in top3_indices:
-                            disease_name = model.classes_[i]
-                            probability = prediction_proba[i]
-                            suggestion_row = medications_df[medications_df["Disease"].str.lower() == disease_name.lower()]
-                            suggestions = suggestion_row["Suggestion"].tolist() if not suggestion_row.empty else ["Consult a healthcare professional."]
-                            
-                            results["top_predictions"].append({
-                                "disease": disease_name,
-                                "probability": probability,
-                                "suggestions": suggestions
-                            })
-                        
                         st.session_state.analysis_results = results
-                        # NEW: Add to history
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        top_disease = results['top_predictions'][0]['disease']
-                        st.session_state.history.insert(0, f"{timestamp} - {top_disease}")
+                        log_analysis(results)
                         st.rerun()
 
                     except Exception as e:
@@ -364,6 +459,12 @@ def render_results():
             st.markdown("<hr style='border-color: var(--card-border);'>", unsafe_allow_html=True)
             
             st.markdown("<div class='result-header'>Detailed Breakdown & Recommendations</div>", unsafe_allow_html=True)
+            explanations = explain_predictions(results['selected_symptoms'], results['top_predictions'],
+                                               results.get('model_version'))
+            if explanations is None:
+                st.caption("ℹ️ The model was updated after this analysis, so what drove each prediction is not shown. "
+                           "Run the analysis again to see it.")
+                explanations = {}
             for i, pred in enumerate(results['top_predictions']):
                 expander_title = f"**{i+1}. {pred['disease']}** ({pred['probability']*100:.1f}% confidence)"
                 with st.expander(expander_title, expanded=(i == 0)):
@@ -371,12 +472,46 @@ def render_results():
                     for s in pred['suggestions']:
                         st.markdown(f"<li>{s}</li>", unsafe_allow_html=True)
                     st.markdown("</ul>", unsafe_allow_html=True)
+                    explanation = explanations.get(pred['disease'])
+                    if explanation:
+                        st.markdown("**What drove this prediction**")
+                        drivers = [f"{d['symptom'].replace('_', ' ').strip().title()}: {d['contribution']*100:+.1f} pts"
+                                   for d in explanation['symptoms']]
+                        st.write(" · ".join(drivers))
+                        st.caption(f"Starting point {explanation['baseline']*100:.1f}% (how common the disease is in training) · "
+                                   f"symptoms you did not select {explanation['absent_symptoms']*100:+.1f} pts · "
+                                   f"total {explanation['probability']*100:.1f}%")
+
+            if model_snapshot.case_index is not None:
+                with st.expander("🗂️ Similar Known Cases"):
+                    with timed("similar_cases"):
+                        cases = model_snapshot.case_index.query(results['selected_symptoms'], k=5)
+                    st.dataframe(pd.DataFrame({
+                        "Prognosis": [c['prognosis'] for c in cases],
+                        "Similarity": [f"{c['jaccard']*100:.0f}%" for c in cases],
+                        "Shared Symptoms": [c['shared_symptoms'] for c in cases],
+                        "Training Cases": [c['training_rows'] for c in cases],
+                        "Case Symptoms": [", ".join(s.replace('_', ' ').strip().title() for s in c['symptoms']) for c in cases],
+                    }), hide_index=True, use_container_width=True)
+
+            next_symptoms = recommend_next_symptoms(results['selected_symptoms'])
+            if next_symptoms:
+                st.markdown("<div class='result-header'>Worth Checking Next</div>", unsafe_allow_html=True)
+                st.caption("Symptoms that would most sharpen this diagnosis if present. Add one to update the analysis.")
+                for rec in next_symptoms:
+                    rec_cols = st.columns([3, 1])
+                    rec_cols[0].write(f"**{rec['symptom'].replace('_', ' ').strip().title()}** · "
+                                      f"if present: {rec['top_disease_if_present']} "
+                                      f"({rec['top_probability_if_present']*100:.0f}%)")
+                    rec_cols[1].button("➕ Add", key=f"add_{rec['symptom']}", on_click=add_symptom_to_results,
+                                       args=(rec['symptom'],), use_container_width=True)
             
             st.write("")
-            pdf_data = create_pdf_report(results)
+            # Rendered only when the button is clicked, and once per distinct results.
+            results_key = report_key(results)
             st.download_button(
                 label="📥 Download Report as PDF",
-                data=pdf_data,
+                data=lambda: render_pdf_report(results, results_key),
                 file_name=f"DiagnoX_Report_{results['user_name'].replace(' ', '_')}.pdf",
                 mime="application/pdf",
                 use_container_width=True
@@ -385,41 +520,113 @@ def render_results():
             st.markdown("<div class='disclaimer-box'><strong>Disclaimer:</strong> This is an AI-generated insight and not a medical diagnosis. Consult a doctor for accurate health advice.</div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
 
-def create_pdf_report(results):
-    """Generates a PDF report from the analysis results."""
-    # NEW: Pass user details to PDF class
-    pdf = PDF(name=results['user_name'], age=results['user_age'])
-    pdf.add_page()
-    
-    pdf.chapter_title("Patient Input Summary")
-    # NEW: Include all user details in PDF body
-    pdf.chapter_body(f"Name: {results['user_name']}\n"
-                     f"Age: {results['user_age']}\n"
-                     f"Symptom Severity: {results['severity']}\n"
-                     f"Selected Symptoms: {', '.join([s.replace('_', ' ').title() for s in results['selected_symptoms']])}")
-
-    if results['severity'] == 'Severe':
-        pdf.set_text_color(255, 0, 0)
-        pdf.chapter_body("⚠️ WARNING: Symptoms were marked as SEVERE. Seek immediate medical attention.")
-        pdf.set_text_color(0, 0, 0)
-        
-    pdf.chapter_title("Differential Diagnosis Results")
-    for i, pred in enumerate(results['top_predictions']):
-        pdf.add_diagnosis(f"{i+1}. {pred['disease']}", pred['probability'])
-    pdf.ln(5)
-
-    pdf.chapter_title("Detailed Recommendations")
-    for i, pred in enumerate(results['top_predictions']):
-        pdf.set_font('Arial', 'B', 11)
-        pdf.cell(0, 10, f"{i+1}. {pred['disease']}", 0, 1, 'L')
-        for suggestion in pred['suggestions']:
-            pdf.set_font('Arial', '', 11)
-            pdf.multi_cell(0, 5, f" - {suggestion}")
-        pdf.ln(3)
-
-    pdf_bytes = pdf.output(dest="S").encode("latin-1") if isinstance(pdf.output(dest="S"), str) else pdf.output(dest="S")
-    return io.BytesIO(pdf_bytes).getvalue()
-    
+@st.fragment
+def render_bulk_scoring():
+    """Renders the bulk CSV upload option; its widgets rerun only this fragment."""
+    st.title("📂 Bulk CSV Scoring")
+    uploaded = st.file_uploader("Upload patients CSV", type="csv", help="One 0/1 column per symptom, or a 'symptoms' column listing names separated by ';'.")
+    top_k = st.number_input("Top diagnoses per patient", min_value=1, max_value=len(model.classes_), value=3, step=1)
+    if uploaded is not None and st.button("Score File", use_container_width=True):
+        output = io.StringIO()
+        try:
+            with st.spinner("Scoring..."):
+                summary = score_csv(uploaded, output, model, model_features, medications_index, top_k=int(top_k))
+        except pd.errors.EmptyDataError:
+            st.error("The uploaded file is empty.")
+            return
+        except (InputError, pd.errors.ParserError) as e:
+            st.error(f"Could not score this file: {e}")
+            return
+        st.success(f"Scored {summary['rows']} patients.")
+        if summary['unscored']:
+            st.warning(f"{summary['unscored']} rows had no recognised symptom and were left unscored "
+                       f"(see the scoring_status column).")
+        if summary['with_unknown_symptoms']:
+            st.warning(f"{summary['with_unknown_symptoms']} rows list symptoms the model does not know; "
+                       f"they are shown in the unknown_symptoms column and were ignored.")
+        st.download_button(
+            label="📥 Download Scored CSV",
+            data=output.getvalue(),
+            file_name=f"DiagnoX_Scored_{uploaded.name}",
+            mime="text/csv",
+            use_container_width=True
+        )
+
+HISTORY_PAGE_SIZE = 10
+
+@st.fragment
+def render_history():
+    """Pages through this session's analyses from the history log."""
+    store = get_history_store()
+    session_id = st.session_state.session_id
+    diseases = store.diseases(session_id)
+    disease = None
+    if len(diseases) > 1:
+        choice = st.selectbox("Filter by diagnosis", ["All diagnoses"] + diseases, key="history_filter",
+                              on_change=lambda: st.session_state.history_cursors.clear())
+        disease = None if choice == "All diagnoses" else choice
+
+    cursors = st.session_state.history_cursors
+    rows, next_cursor = store.page(session_id, disease, before=cursors[-1] if cursors else None, limit=HISTORY_PAGE_SIZE)
+    if not cursors:
+        # Just-submitted analyses may still be waiting in the write-behind queue.
+        committed = {(r["created_at"], r["top_disease"]) for r in rows}
+        queued = [r for r in store.pending(session_id, disease) if (r["created_at"], r["top_disease"]) not in committed]
+        rows = (queued + rows)[:HISTORY_PAGE_SIZE]
+    if not rows:
+        st.info("Your session analyses will be recorded here.")
+        return
+    for row in rows:
+        timestamp = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        st.success(f"{timestamp} - {row['top_disease']}", icon="✅")
+
+    nav = st.columns(2)
+    if cursors:
+        nav[0].button("◀ Newer", on_click=cursors.pop, use_container_width=True)
+    if next_cursor is not None:
+        nav[1].button("Older ▶", on_click=cursors.append, args=(next_cursor,), use_container_width=True)
+    st.button("Clear History", on_click=clear_history)
+
+def clear_history():
+    """Starts a fresh log for this session; the old rows are deleted in the background."""
+    get_history_store().clear_session(st.session_state.session_id)
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.history_cursors = []
+
+def render_history_stats():
+    """Admin panel with analyses per diagnosis over the last week, across all sessions (DIAGNOX_ADMIN=1)."""
+    with st.expander("📊 Analysis Statistics"):
+        since = (datetime.now() - pd.Timedelta(days=6)).strftime("%Y-%m-%d")
+        counts = pd.DataFrame(get_history_store().daily_disease_counts(since_day=since))
+        if counts.empty:
+            st.caption("No analyses logged in the last 7 days.")
+            return
+        per_day = counts.pivot_table(index="day", columns="disease", values="n", aggfunc="sum", fill_value=0)
+        st.bar_chart(per_day)
+        totals = counts.groupby("disease")["n"].sum().sort_values(ascending=False)
+        st.dataframe(totals.rename("analyses").head(10), use_container_width=True)
+        history_stats = get_history_store().stats()
+        st.caption(f"Log writer: {history_stats['written']} written · {history_stats['queued']} queued · "
+                   f"{history_stats['dropped']} dropped")
+
+def render_metrics_panel():
+    """Admin panel with per-stage latency summaries for this process (DIAGNOX_ADMIN=1)."""
+    with st.expander("📈 Performance Metrics"):
+        if not REGISTRY.enabled:
+            st.caption("Stage timing is off. Start the app with DIAGNOX_METRICS=1 to enable it.")
+            return
+        summary = REGISTRY.snapshot()
+        if not summary:
+            st.caption("No timings recorded yet.")
+            return
+        table = pd.DataFrame.from_dict(summary, orient="index")
+        table.index.name = "stage"
+        st.dataframe(table.style.format({"count": "{:d}", "mean_ms": "{:.2f}", "p50_ms": "{:.2f}",
+                                         "p95_ms": "{:.2f}", "p99_ms": "{:.2f}"}),
+                     use_container_width=True)
+        if get_metrics_server() is not None:
+            st.caption(f"Prometheus endpoint: http://127.0.0.1:{get_metrics_server().server_address[1]}/metrics")
+
 def render_footer():
     """Renders the page footer."""
     st.markdown("<div class='footer'>DiagnoX AI Pro &copy; 2025 | Advanced Insights by Vansh</div>", unsafe_allow_html=True)
@@ -429,13 +636,17 @@ if __name__ == "__main__":
     # NEW: Sidebar for history
     with st.sidebar:
         st.title("📜 Analysis Log")
-        if not st.session_state.history:
-            st.info("Your session analyses will be recorded here.")
-        for item in st.session_state.history:
-            st.success(item, icon="✅")
-        if st.session_state.history and st.button("Clear History"):
-            st.session_state.history = []
-            st.rerun()
+        render_history()
+        st.markdown("---")
+        render_bulk_scoring()
+        cache_stats = get_prediction_cache().stats()
+        if load_data().last_error:
+            st.warning(f"Model reload failed, still serving the previous model: {load_data().last_error}")
+        st.caption(f"Model v{model_snapshot.version} · Prediction cache: {cache_stats['size']}/{cache_stats['maxsize']} entries · "
+                   f"{cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['evictions']} evictions")
+        if SHOW_ADMIN_PANELS:
+            render_metrics_panel()
+            render_history_stats()
 
     render_header()
     
@@ -450,3 +661,5 @@ if __name__ == "__main__":
         st.info("👆 Begin by entering your details and symptoms above, then click 'Analyze' for your differential diagnosis.")
 
     render_footer()
+    # Reruns cut short by st.rerun() are not recorded; the rerun they trigger is.
+    REGISTRY.observe("rerun", time.perf_counter() - RERUN_STARTED)
@@ -0,0 +1,168 @@
+import numpy as np
+
+from forest_engine import FlatForest, _as_binary
+from inference import encode_symptom_lists
+
+# --- Tree-Path Symptom Attribution ---
+# Explains a forest prediction by following each tree's decision path
+# (Saabas-style). Every node stores the class mix of the training rows that
+# reached it. When a split on symptom f moves the path from node n to child m,
+# the change values[m] - values[n] is credited to f. Summed along a path, the
+# changes telescope, so each tree decomposes exactly as
+#
+#   leaf value = root value + sum of its split contributions
+#
+# and, averaged over trees, the forest probability of every class is
+#
+#   P(class | x) = baseline + sum_f contribution[f]
+#
+# where the baseline is the mean root value (the training class mix). A
+# contribution belongs to a symptom whether the path tested it as present or
+# absent. One walk visits every tree at once, one depth level per step, so a
+# full explanation (every symptom x every class) takes about a millisecond.
+# Subtrees shared between trees by forest_compression.py are fine: the walk
+# goes down from the roots and never needs a parent pointer. Batches walk
+# each distinct (symptoms, class) pair once.
+
+DEFAULT_TOP_SYMPTOMS = 3
+
+
+class PathAttributor:
+    """Per-symptom contributions to every class probability of a FlatForest."""
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.is_leaf = forest.is_leaf
+        self.classes_ = forest.classes_
+        self.n_features = forest.n_features
+        self.baseline = self._values(forest.roots).mean(axis=0)
+
+    def _values(self, nodes, target=None):
+        """Node class values as float64, scaled if the forest is quantized.
+
+        Only the gathered nodes are converted, so the forest's (possibly
+        memory-mapped) value array is never copied as a whole.
+        """
+        values = self.forest.values[nodes] if target is None else self.forest.values[nodes, target]
+        values = values.astype(np.float64)
+        if self.forest.value_scale is not None:
+            values *= self.forest.value_scale
+        return values
+
+    @classmethod
+    def from_model(cls, model):
+        """Builds an attributor for a FlatForest or a fitted sklearn tree ensemble."""
+        return cls(model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model))
+
+    def explain(self, x):
+        """Contributions of each symptom of one row, shape (features, classes).
+
+        `self.baseline + contributions.sum(axis=0)` equals the forest's
+        predict_proba for the row.
+        """
+        x = _as_binary(x, self.n_features)[0]
+        n_classes = len(self.classes_)
+        contributions = np.zeros(self.n_features * n_classes)
+        class_ids = np.arange(n_classes)
+        nodes = self.forest.roots.astype(np.intp)
+        while True:
+            nodes = nodes[~self.is_leaf[nodes]]
+            if len(nodes) == 0:
+                break
+            split = self.forest.feature[nodes].astype(np.intp)
+            children = self.forest.children[nodes, x[split]].astype(np.intp)
+            delta = self._values(children) - self._values(nodes)
+            contributions += np.bincount((split[:, None] * n_classes + class_ids).ravel(), weights=delta.ravel(),
+                                         minlength=len(contributions))
+            nodes = children
+        return contributions.reshape(self.n_features, n_classes) / self.forest.n_estimators
+
+    def explain_batch(self, X, class_indices, chunk_rows=2048):
+        """Contributions of each symptom to one class per row, shape (rows, features).
+
+        `class_indices[i]` picks the class explained for row i (typically its
+        top prediction). Returns (baselines, contributions); baselines[i] plus
+        the row sum of contributions[i] is that class's probability.
+        """
+        class_indices = np.asarray(class_indices, dtype=np.intp)
+        _, inverse, contributions = self._explain_unique(X, class_indices, chunk_rows)
+        return self.baseline[class_indices], contributions[inverse]
+
+    def drivers(self, X, class_indices, features, n=DEFAULT_TOP_SYMPTOMS, chunk_rows=2048):
+        """Per row, up to `n` present symptoms that raised its class most, e.g. 'fever (+0.21); chills (+0.08)'."""
+        X = _as_binary(X, self.n_features)
+        first, inverse, contributions = self._explain_unique(X, class_indices, chunk_rows)
+        return np.asarray(format_drivers(contributions, X[first], features, n), dtype=object)[inverse]
+
+    def _explain_unique(self, X, class_indices, chunk_rows):
+        """Walks each distinct (symptoms, class) pair once, as predict_proba does for rows.
+
+        Returns (first row of each pair, row -> pair index, pair contributions).
+        """
+        X = _as_binary(X, self.n_features)
+        class_indices = np.asarray(class_indices, dtype=np.intp)
+        keys = np.concatenate([np.packbits(X, axis=1), class_indices.astype("<u2").view(np.uint8).reshape(-1, 2)],
+                              axis=1)
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        contributions = np.zeros((len(first), self.n_features))
+        for start in range(0, len(first), chunk_rows):
+            rows = first[start:start + chunk_rows]
+            contributions[start:start + len(rows)] = self._walk_chunk(X[rows], class_indices[rows])
+        contributions /= self.forest.n_estimators
+        return first, inverse.ravel(), contributions
+
+    def _walk_chunk(self, X, class_indices):
+        n_rows = len(X)
+        rows = np.repeat(np.arange(n_rows), self.forest.n_estimators)
+        nodes = np.tile(self.forest.roots.astype(np.intp), n_rows)
+        out = np.zeros(n_rows * self.n_features)
+        while True:
+            internal = ~self.is_leaf[nodes]
+            rows, nodes = rows[internal], nodes[internal]
+            if len(nodes) == 0:
+                break
+            split = self.forest.feature[nodes].astype(np.intp)
+            children = self.forest.children[nodes, X[rows, split]].astype(np.intp)
+            target = class_indices[rows]
+            delta = self._values(children, target) - self._values(nodes, target)
+            out += np.bincount(rows * self.n_features + split, weights=delta, minlength=len(out))
+            nodes = children
+        return out.reshape(n_rows, self.n_features)
+
+
+def explain_selection(attributor, features, selected, class_indices):
+    """Breaks down the probability of each given class for one symptom selection.
+
+    Returns one dict per class with the baseline, each selected symptom's
+    contribution (largest first) and the combined contribution of the
+    symptoms that are absent; the three always add up to the probability.
+    """
+    x = encode_symptom_lists([selected], features)[0]
+    contributions = attributor.explain(x)
+    present = np.flatnonzero(x)
+    explanations = []
+    for c in class_indices:
+        selected_part = contributions[present, c]
+        order = np.argsort(-selected_part, kind="stable")
+        baseline = float(attributor.baseline[c])
+        absent = float(contributions[:, c].sum() - selected_part.sum())
+        explanations.append({
+            "disease": attributor.classes_[c],
+            "probability": baseline + float(contributions[:, c].sum()),
+            "baseline": baseline,
+            "absent_symptoms": absent,
+            "symptoms": [{"symptom": features[present[i]], "contribution": float(selected_part[i])} for i in order],
+        })
+    return explanations
+
+
+def format_drivers(contributions, X, features, n=DEFAULT_TOP_SYMPTOMS):
+    """Formats the `n` present symptoms with the largest positive contribution in each row."""
+    masked = np.where((np.asarray(X) > 0) & (contributions > 0), contributions, -np.inf)
+    n = min(n, masked.shape[1])
+    top = np.argsort(-masked, axis=1, kind="stable")[:, :n]
+    drivers = []
+    for row, cols in enumerate(top):
+        parts = [f"{features[c]} ({contributions[row, c]:+.2f})" for c in cols if np.isfinite(masked[row, c])]
+        drivers.append("; ".join(parts))
+    return drivers
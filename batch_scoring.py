@@ -0,0 +1,201 @@
+import argparse
+import pickle
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from attribution import PathAttributor
+from inference import (
+    build_suggestions_index,
+    encode_symptom_lists,
+    feature_order,
+    predict_proba,
+    suggestions_for,
+    top_k_indices,
+)
+from model_bundle import DEFAULT_BUNDLE_PATH, load_bundle
+from packed_dataset import PackedDataset, is_packed_path
+
+# --- Bulk CSV Scoring ---
+# Scores intake files in fixed-size chunks so memory is bounded by the chunk
+# size, not the file size. Two input layouts are accepted:
+#   * wide:  one 0/1 column per symptom (same layout as Training.csv)
+#   * list:  a "symptoms" column holding names separated by ; | or ,
+#   * packed: a bit-packed .dxb file (see packed_dataset.py)
+# Any other columns (e.g. a patient id) are copied through to the output.
+# Input is checked rather than guessed at: symptom names the model does not
+# know are listed per row in `unknown_symptoms`, rows with no recognised
+# symptom are marked in `scoring_status` and left unscored, and a wide file
+# that matches none of the model's features or holds non-numeric symptom
+# cells raises InputError.
+# With --explain, each prediction also gets a drivers_N column naming the
+# selected symptoms that raised its probability most (see attribution.py).
+
+SYMPTOM_LIST_COLUMN = "symptoms"
+IGNORED_COLUMNS = {"prognosis", "Unnamed: 133"}
+SUGGESTION_SEPARATOR = " | "
+UNKNOWN_SEPARATOR = "; "
+STATUS_COLUMN = "scoring_status"
+STATUS_SCORED = "scored"
+STATUS_NO_SYMPTOMS = "no recognised symptoms"
+_LIST_SPLIT = re.compile(r"[;|,]")
+
+
+class InputError(ValueError):
+    """Raised when an intake file cannot be scored as given."""
+
+
+def parse_symptom_list(value):
+    """Splits a 'symptoms' cell into individual symptom names."""
+    if not isinstance(value, str):
+        return []
+    return [s.strip() for s in _LIST_SPLIT.split(value) if s.strip()]
+
+
+def encode_chunk(chunk, features):
+    """Turns one CSV chunk into a 0/1 matrix in model feature order.
+
+    Returns (matrix, unknown names per row or None for wide input).
+    """
+    if SYMPTOM_LIST_COLUMN in chunk.columns:
+        known = set(features)
+        symptom_lists = chunk[SYMPTOM_LIST_COLUMN].map(parse_symptom_list)
+        unknown = [UNKNOWN_SEPARATOR.join(s for s in symptoms if s not in known) for symptoms in symptom_lists]
+        return encode_symptom_lists(symptom_lists, features), unknown
+
+    matched = [f for f in features if f in chunk.columns]
+    if not matched:
+        raise InputError(f"None of the columns match the model's symptoms. Expected 0/1 columns such as "
+                         f"{', '.join(features[:3])}, or a '{SYMPTOM_LIST_COLUMN}' column listing names.")
+    values = chunk[matched].apply(pd.to_numeric, errors="coerce")
+    bad = values.isna() & chunk[matched].notna()
+    if bad.to_numpy().any():
+        row, col = np.argwhere(bad.to_numpy())[0]
+        raise InputError(f"Non-numeric value {chunk[matched].iat[row, col]!r} in symptom column "
+                         f"'{matched[col]}' (row {chunk.index[row] + 1}); symptom columns must be 0 or 1.")
+    wide = values.reindex(columns=features, fill_value=0).fillna(0)
+    return (wide.to_numpy() > 0).astype(np.uint8), None
+
+
+def passthrough_columns(chunk, features):
+    """Columns that are neither symptoms nor inputs and are copied to the output."""
+    skip = set(features) | IGNORED_COLUMNS | {SYMPTOM_LIST_COLUMN}
+    return [c for c in chunk.columns if c not in skip]
+
+
+def score_chunk(model, features, chunk, suggestions_index, top_k=3, attributor=None):
+    """Scores a single chunk with one vectorized predict_proba call.
+
+    Rows without any recognised symptom keep their passthrough columns but
+    get no predictions.
+    """
+    X_all, unknown = encode_chunk(chunk, features)
+    scored = X_all.any(axis=1)
+    X = X_all[scored]
+    classes = np.asarray(model.classes_)
+
+    out = chunk[passthrough_columns(chunk, features)].reset_index(drop=True)
+    out[STATUS_COLUMN] = np.where(scored, STATUS_SCORED, STATUS_NO_SYMPTOMS)
+    if unknown is not None:
+        out["unknown_symptoms"] = unknown
+    k = min(top_k, len(classes))
+    if len(X):
+        proba = predict_proba(model, X)
+        top = top_k_indices(proba, k)
+        rows = np.arange(len(X))
+    for rank in range(k):
+        diseases = pd.Series(None, index=out.index, dtype=object)
+        probabilities = pd.Series(np.nan, index=out.index)
+        drivers = pd.Series(None, index=out.index, dtype=object)
+        if len(X):
+            diseases[scored] = classes[top[:, rank]]
+            probabilities[scored] = proba[rows, top[:, rank]]
+            if attributor is not None:
+                drivers[scored] = attributor.drivers(X, top[:, rank], features)
+        lookup = {d: SUGGESTION_SEPARATOR.join(suggestions_for(d, suggestions_index)) for d in diseases.dropna().unique()}
+        out[f"disease_{rank + 1}"] = diseases
+        out[f"probability_{rank + 1}"] = probabilities
+        out[f"suggestions_{rank + 1}"] = diseases.map(lookup)
+        if attributor is not None:
+            out[f"drivers_{rank + 1}"] = drivers
+    return out
+
+
+def score_csv(source, destination, model, features, suggestions_index, top_k=3, chunksize=10000, attributor=None):
+    """Streams `source` through the model and writes results to `destination`.
+
+    Both arguments may be paths or file-like objects; a `source` path ending
+    in .dxb is read as a packed dataset. Returns counts of all rows, rows left
+    unscored (no recognised symptom) and rows naming unknown symptoms.
+    """
+    if is_packed_path(source):
+        chunks = PackedDataset(source).iter_frames(chunksize)
+    else:
+        chunks = pd.read_csv(source, chunksize=chunksize)
+    summary = {"rows": 0, "unscored": 0, "with_unknown_symptoms": 0}
+    for i, chunk in enumerate(chunks):
+        scored = score_chunk(model, features, chunk, suggestions_index, top_k, attributor)
+        scored.to_csv(destination, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        summary["rows"] += len(scored)
+        summary["unscored"] += int((scored[STATUS_COLUMN] != STATUS_SCORED).sum())
+        if "unknown_symptoms" in scored.columns:
+            summary["with_unknown_symptoms"] += int((scored["unknown_symptoms"] != "").sum())
+    return summary
+
+
+def load_artifacts(bundle_path=DEFAULT_BUNDLE_PATH, model_path=None, medications_path="medications.csv"):
+    """Loads the model, feature order and suggestions index used for scoring.
+
+    Uses the app bundle by default; pass `model_path` to score with a raw
+    pickled model and medications.csv instead.
+    """
+    if model_path is None:
+        bundle = load_bundle(bundle_path)
+        return bundle["model"], bundle["features"], bundle["suggestions"]
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    suggestions_index = build_suggestions_index(pd.read_csv(medications_path))
+    return model, feature_order(model), suggestions_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of patients with the DiagnoX model.")
+    parser.add_argument("input", help="CSV with symptom columns or a 'symptoms' list column, or a .dxb file")
+    parser.add_argument("output", help="where to write the scored CSV")
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--model", help="pickled model to use instead of the bundle")
+    parser.add_argument("--medications", default="medications.csv")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--explain", action="store_true", help="add the symptoms driving each prediction")
+    args = parser.parse_args(argv)
+
+    model, features, suggestions_index = load_artifacts(args.bundle, args.model, args.medications)
+    attributor = PathAttributor.from_model(model) if args.explain else None
+    start = time.perf_counter()
+    try:
+        with open(args.output, "w", newline="") as out:
+            summary = score_csv(args.input, out, model, features, suggestions_index, args.top_k, args.chunksize,
+                                attributor)
+    except pd.errors.EmptyDataError:
+        print(f"❌ {args.input} is empty.")
+        return 1
+    except InputError as e:
+        print(f"❌ {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+    rows = summary["rows"]
+    print(f"✅ Scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}")
+    if summary["unscored"]:
+        print(f"⚠️ {summary['unscored']} rows had no recognised symptom and were not scored ({STATUS_COLUMN} column).")
+    if summary["with_unknown_symptoms"]:
+        print(f"⚠️ {summary['with_unknown_symptoms']} rows name symptoms the model does not know "
+              f"(unknown_symptoms column).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,696 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import streamlit
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.DownloadButton_pb2 import DownloadButton
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.testing.v1 import AppTest
+from websockets.asyncio.client import connect
+
+from bench_reruns import HERE, materialize, multiselect_with
+from inference import predict_proba
+from model_bundle import DEFAULT_BUNDLE_PATH
+from model_store import ModelStore
+
+# --- Benchmark: Concurrent Sessions of app2.py ---
+# Starts the real app with `streamlit run` and connects --sessions simulated
+# browser tabs to it at once over the app's websocket. Every tab goes through
+# the flow on its own, as fast as the server answers: load the page, fill in
+# its details and random symptoms (reruns per changed widget when the app has
+# no form yet), submit, add a suggested symptom, and download the PDF report,
+# whether it is rendered on click or with the page. The tabs share the server's process-wide caches
+# (model, predictions, reports, history log) and compete for its script
+# threads and the GIL, so the latencies include queueing behind the other
+# tabs. Each entry of the --sessions sweep (1 10 50 100 by default) gets a fresh
+# server warmed up by one session. The clients run on the same machine; their
+# protobuf work is small next to a script run. The report holds:
+#   levels:        per session count, latency percentiles per interaction,
+#                  the flow's throughput, PDFs that were gone by the time the
+#                  tab fetched them (any lost PDF fails the run), the server's
+#                  RSS with every tab
+#                  connected (and its peak), RSS growth per session and the
+#                  history log's growth on disk
+#   limits:        the first session count whose worst p99 crosses
+#                  --p99-threshold-ms or whose peak RSS crosses
+#                  --rss-threshold-mb (null when the sweep stays below)
+#   session_state: the deep size of each session_state entry after the flow
+#                  (analysis_results, history cursors, ...), read from a few
+#                  AppTest sessions since the server keeps it out of reach
+#   cold_start:    load_data's ModelStore construction in a fresh interpreter
+#   throughput:    predict_proba rows/s of the served model, single and batch
+# --json / --output write everything as one JSON document stamped with the git
+# commit; --compare BASELINE.json prints the change of every number against an
+# earlier run, e.g.
+#   python bench_app_sessions.py --output before.json      (on the old commit)
+#   python bench_app_sessions.py --compare before.json     (on the new one)
+# The 1.5 s "analyzing" pause is off by default (--analyze-delay to keep it).
+# Server RSS is read from /proc, so the sweep needs Linux.
+#
+# AppTest runs one script run per process at a time, so the tabs speak the
+# browser's protocol instead. It is Streamlit-internal, not public API:
+#   * BackMsg.rerun_script with ClientState.widget_states, keyed by the widget
+#     ids found in ForwardMsg deltas, and ForwardMsg.script_finished;
+#   * BackMsg.backend_operation_request.deferred_file plus the session id from
+#     NewSession.initialize, for download_button(data=callable);
+#   * MediaFileManager.add_deferred, patched during the AppTest runs only.
+# check_streamlit() refuses to run when any of these is missing, and warns
+# when the installed version is not one of STREAMLIT_TESTED.
+
+logging.getLogger("streamlit").setLevel(logging.CRITICAL)
+
+PERCENTILES = (50, 90, 95, 99)
+# Session keys app2.py manages itself; keyed widget values are summed apart.
+APP_STATE_KEYS = ("analysis_results", "history_cursors", "session_id")
+MIN_SYMPTOMS, MAX_SYMPTOMS = 2, 5
+SEVERITIES = ["Mild", "Moderate", "Severe"]
+SYMPTOM_PICKER_LABEL = "Select from "
+STREAMLIT_TESTED = ("1.66",)
+# message type -> fields the load driver relies on
+PROTOCOL = {
+    BackMsg: ("rerun_script", "backend_operation_request"),
+    ClientState: ("widget_states",),
+    ForwardMsg: ("new_session", "delta", "script_finished", "backend_operation_response"),
+    DownloadButton: ("url", "deferred_file_id"),
+}
+
+
+def check_streamlit():
+    """Raises if the Streamlit internals used here are gone; returns a warning if untested."""
+    missing = [f"{message.__name__}.{name}" for message, names in PROTOCOL.items()
+               for name in names if name not in message.DESCRIPTOR.fields_by_name]
+    if not hasattr(MediaFileManager, "add_deferred"):
+        missing.append("MediaFileManager.add_deferred")
+    if missing:
+        raise RuntimeError(f"streamlit {streamlit.__version__} lacks {', '.join(missing)}; this benchmark speaks "
+                           f"Streamlit's internal protocol as of {', '.join(STREAMLIT_TESTED)}")
+    if ".".join(streamlit.__version__.split(".")[:2]) not in STREAMLIT_TESTED:
+        return f"streamlit {streamlit.__version__} is untested here (tested: {', '.join(STREAMLIT_TESTED)})"
+    return None
+
+
+@contextmanager
+def remember_deferred_downloads():
+    """Collects the callables download_button(data=callable) registers, by file id.
+
+    The button only registers the callable with the runtime's media manager;
+    a browser click then runs it. AppTest drops that manager after each run,
+    so the callables are kept here to click the button the same way. The
+    manager is private Streamlit API, see check_streamlit().
+    """
+    downloads = {}
+    add_deferred = MediaFileManager.add_deferred
+
+    def remember(self, data_callable, *args, **kwargs):
+        file_id = add_deferred(self, data_callable, *args, **kwargs)
+        downloads[file_id] = data_callable
+        return file_id
+
+    MediaFileManager.add_deferred = remember
+    try:
+        yield downloads
+    finally:
+        MediaFileManager.add_deferred = add_deferred
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes held by a value and everything it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in obj)
+    return size
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    stats = {f"p{p}_ms": float(np.percentile(samples, p)) for p in PERCENTILES}
+    stats.update(mean_ms=float(samples.mean()), max_ms=float(samples.max()), count=len(samples))
+    return stats
+
+
+class AppTestSession:
+    """One simulated user driving app2.py through AppTest, for its session_state."""
+
+    def __init__(self, path, timeout, rng, index, downloads):
+        self.at = AppTest.from_file(path, default_timeout=timeout)
+        self.rng = rng
+        self.name = f"Bench User {index}"
+        self.downloads = downloads
+
+    def run(self):
+        self.at.run()
+        if self.at.exception:
+            raise RuntimeError(f"{self.name}: {self.at.exception[0].message}")
+
+    def page_load(self):
+        self.run()
+
+    def fill_inputs(self):
+        """Sets the details and symptoms; only the state matters here, so nothing reruns yet."""
+        at = self.at
+        at.text_input[0].input(self.name)
+        at.number_input[0].set_value(int(self.rng.integers(18, 90)))
+        options = [o for m in at.multiselect if m.label.startswith(SYMPTOM_PICKER_LABEL) for o in m.options]
+        picks = self.rng.choice(options, size=int(self.rng.integers(MIN_SYMPTOMS, MAX_SYMPTOMS + 1)), replace=False)
+        for symptom in picks:
+            multiselect_with(at, symptom).select(symptom)
+        at.select_slider[0].set_value(str(self.rng.choice(SEVERITIES)))
+
+    def submit(self):
+        next(b for b in self.at.button if b.label == "Analyze Symptoms").click()
+        self.run()
+        if not self.at.session_state.analysis_results:
+            raise RuntimeError(f"{self.name}: analysis produced no results")
+
+    def add_symptom(self):
+        """Clicks the first "Add" suggestion on the results page, if any."""
+        add = [b for b in self.at.button if b.label.endswith("Add")]
+        if add:
+            add[0].click()
+            self.run()
+
+    def download_pdf(self):
+        button = self.at.get("download_button")[0]
+        if not button.proto.deferred_file_id:
+            return  # rendered with the page, nothing left to run
+        pdf = self.downloads.pop(button.proto.deferred_file_id)()
+        if not bytes(pdf).startswith(b"%PDF"):
+            raise RuntimeError(f"{self.name}: the download is not a PDF")
+
+    def state_sizes(self):
+        sizes = {key: 0 for key in APP_STATE_KEYS + ("widget_values",)}
+        for key, value in self.at.session_state.items():
+            sizes[key if key in APP_STATE_KEYS else "widget_values"] += deep_size(value)
+        return sizes
+
+
+class LiveSession:
+    """One simulated browser tab talking to a running app over its websocket."""
+
+    def __init__(self, port, timeout, rng, index):
+        self.port = port
+        self.timeout = timeout
+        self.rng = rng
+        self.name = f"Bench User {index}"
+        self.ws = None
+        self.session_id = None
+        self.elements = []
+        self.inputs = []
+        self.lost_downloads = 0
+
+    async def receive(self):
+        msg = ForwardMsg.FromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+        if msg.WhichOneof("type") == "new_session" and msg.new_session.HasField("initialize"):
+            self.session_id = msg.new_session.initialize.session_id
+        return msg
+
+    async def rerun(self, widgets=(), trigger=None):
+        """Reruns the script with (id, value field, value) widget states; returns ms until it finished."""
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        states = msg.rerun_script.widget_states.widgets
+        for widget_id, field, value in widgets:
+            state = states.add(id=widget_id)
+            if field == "string_array_value":
+                state.string_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+        if trigger is not None:
+            states.add(id=trigger, trigger_value=True)
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        elements = []
+        while True:
+            msg = await self.receive()
+            kind = msg.WhichOneof("type")
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                kind = element.WhichOneof("type")
+                elements.append((kind, getattr(element, kind)))
+            elif kind == "script_finished":
+                # st.rerun() ends the run early; the page is the one it starts.
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+                elements = []
+        elapsed = (time.perf_counter() - start) * 1e3
+        self.elements = elements
+        errors = self.find("exception")
+        if errors:
+            raise RuntimeError(f"{self.name}: {errors[0].message}")
+        return elapsed
+
+    def find(self, kind):
+        return [element for k, element in self.elements if k == kind]
+
+    async def page_load(self):
+        start = time.perf_counter()
+        self.ws = await connect(f"ws://localhost:{self.port}/_stcore/stream", subprotocols=["streamlit"],
+                                max_size=None, open_timeout=self.timeout)
+        await self.rerun()
+        return (time.perf_counter() - start) * 1e3
+
+    async def fill_inputs(self):
+        """Picks the details and symptoms; returns ms spent in reruns, None without any.
+
+        Form fields wait for submit. Revisions of the app without the form
+        rerun on every changed widget, sending all widget values so far as
+        the browser does.
+        """
+        fields = {e.label: e for kind, e in self.elements if kind in ("text_input", "number_input", "slider")}
+        options = [(m.id, o) for m in self.find("multiselect") if m.label.startswith(SYMPTOM_PICKER_LABEL)
+                   for o in m.options]
+        picks = self.rng.choice(len(options), size=int(self.rng.integers(MIN_SYMPTOMS, MAX_SYMPTOMS + 1)), replace=False)
+        selected = {}
+        for i in picks:
+            widget_id, symptom = options[i]
+            selected.setdefault(widget_id, []).append(symptom)
+        self.inputs = [
+            (fields["Name"].id, "string_value", self.name),
+            (fields["Age"].id, "double_value", float(self.rng.integers(18, 90))),
+            *[(widget_id, "string_array_value", symptoms) for widget_id, symptoms in selected.items()],
+            (fields["Severity"].id, "string_array_value", [str(self.rng.choice(SEVERITIES))]),
+        ]
+        if self.submit_button().form_id:
+            return None
+        total = 0.0
+        for changed in range(1, len(self.inputs) + 1):
+            total += await self.rerun(self.inputs[:changed])
+        return total
+
+    def submit_button(self):
+        return next(b for b in self.find("button") if b.label == "Analyze Symptoms")
+
+    async def submit(self):
+        """Submits every field at once, as the browser does on submit."""
+        elapsed = await self.rerun(self.inputs, trigger=self.submit_button().id)
+        if not self.find("download_button"):
+            raise RuntimeError(f"{self.name}: analysis produced no results")
+        return elapsed
+
+    async def add_symptom(self):
+        """Clicks the first "Add" suggestion on the results page, if any."""
+        add = [b for b in self.find("button") if b.label.endswith("Add")]
+        if not add:
+            return None
+        return await self.rerun(trigger=add[0].id)
+
+    async def download_pdf(self):
+        """Clicks the report button and fetches the PDF; None if the file was already gone.
+
+        A deferred report is rendered by the server on request first; an
+        eager one (older revisions) was rendered with the page and is only
+        fetched.
+        """
+        button = self.find("download_button")[0]
+        start = time.perf_counter()
+        if button.deferred_file_id:
+            msg = BackMsg()
+            request = msg.backend_operation_request
+            request.request_id, request.session_id = "pdf", self.session_id
+            request.deferred_file.file_id = button.deferred_file_id
+            await self.ws.send(msg.SerializeToString())
+            while (msg := await self.receive()).WhichOneof("type") != "backend_operation_response":
+                pass
+            response = msg.backend_operation_response
+            if response.error_msg:
+                raise RuntimeError(f"{self.name}: {response.error_msg}")
+            path = response.deferred_file.url
+        else:
+            path = button.url
+        url = f"http://localhost:{self.port}{path}"
+        try:
+            pdf = await asyncio.to_thread(lambda: urllib.request.urlopen(url, timeout=self.timeout).read())
+        except urllib.error.HTTPError as e:
+            # Other sessions' runs delete unreferenced downloads on their second
+            # cleanup pass, so under load the file can be gone before the fetch.
+            if e.code != 404:
+                raise
+            self.lost_downloads += 1
+            return None
+        elapsed = (time.perf_counter() - start) * 1e3
+        if not pdf.startswith(b"%PDF"):
+            raise RuntimeError(f"{self.name}: the download is not a PDF")
+        return elapsed
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+
+FLOW = [
+    ("page_load", "page_load"),
+    ("fill_reruns", "fill_inputs"),
+    ("analyze", "submit"),
+    ("add_symptom", "add_symptom"),
+    ("download_pdf", "download_pdf"),
+]
+
+
+def cold_start_ms(bundle_path, runs):
+    """load_data's work (ModelStore construction) in fresh interpreters, imports excluded."""
+    code = (
+        "import json, time\n"
+        "from model_store import ModelStore\n"
+        "t = time.perf_counter()\n"
+        f"ModelStore({bundle_path!r})\n"
+        "print(json.dumps(time.perf_counter() - t))\n"
+    )
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]) * 1e3)
+    return {"median_ms": float(np.median(samples)), "min_ms": float(min(samples)), "runs": runs}
+
+
+def predict_throughput(bundle_path, batch_rows, seconds, rng):
+    """Single-row and batch predict_proba rate of the model the app serves."""
+    snapshot = ModelStore(bundle_path).current()
+    model, n_features = snapshot.model, len(snapshot.features)
+    X = (rng.random((batch_rows, n_features)) < 4 / n_features).astype(np.uint8)
+
+    def rate(fn, rows_per_call):
+        calls, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            fn()
+            calls += 1
+        return calls * rows_per_call / (time.perf_counter() - start)
+
+    return {
+        "single_rows_per_s": rate(lambda: predict_proba(model, X[:1]), 1),
+        "batch_rows_per_s": rate(lambda: predict_proba(model, X), batch_rows),
+        "batch_rows": batch_rows,
+    }
+
+
+def git_commit():
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE,
+                           capture_output=True, text=True).stdout.strip()
+    return (out.stdout.strip() or None) and out.stdout.strip() + ("-dirty" if dirty else "")
+
+
+def history_bytes(path):
+    """Size of the SQLite history log including its write-ahead log."""
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+def process_rss(pid):
+    """Current RSS of another process, from /proc."""
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@contextmanager
+def serve(path, timeout):
+    """Runs `streamlit run path` on a free port; yields (process, port) once it is healthy."""
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+    command = [sys.executable, "-m", "streamlit", "run", path, "--server.headless", "true",
+               "--server.port", str(port), "--server.fileWatcherType", "none",
+               "--browser.gatherUsageStats", "false"]
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(command, cwd=HERE, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                if process.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f"streamlit exited with {process.returncode}:\n{log.read().decode()[-2000:]}")
+                try:
+                    urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"streamlit did not come up on port {port} in {timeout:g}s")
+                    time.sleep(0.2)
+            yield process, port
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+async def drive(user, latencies):
+    for name, method in FLOW:
+        elapsed = await getattr(user, method)()
+        if elapsed is not None:
+            latencies[name].append(elapsed)
+
+
+async def sample_peak(pid, peak, interval=0.05):
+    while True:
+        peak[0] = max(peak[0], process_rss(pid))
+        await asyncio.sleep(interval)
+
+
+async def load_server(pid, port, sessions, timeout, seed):
+    """Sends `sessions` tabs through the flow at once; the server is warmed up first."""
+    rng = np.random.default_rng(seed)
+    # A warm-up session fills the process-wide caches, as the first visitor would.
+    warmup = LiveSession(port, timeout, np.random.default_rng(seed - 1), -1)
+    await drive(warmup, {name: [] for name, _ in FLOW})
+    await warmup.close()
+
+    history_path = os.environ["DIAGNOX_HISTORY_PATH"]
+    history_before = history_bytes(history_path)
+    rss_before = process_rss(pid)
+    peak = [rss_before]
+    sampler = asyncio.create_task(sample_peak(pid, peak))
+    users = [LiveSession(port, timeout, np.random.default_rng(rng.integers(2**32)), i) for i in range(sessions)]
+    latencies = {name: [] for name, _ in FLOW}
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(drive(user, latencies) for user in users))
+        wall_s = time.perf_counter() - start
+        rss_connected = process_rss(pid)  # every tab is still open
+    finally:
+        sampler.cancel()
+        await asyncio.gather(*(user.close() for user in users), return_exceptions=True)
+    await asyncio.sleep(0.2)  # let the history writer commit
+    history_growth = history_bytes(history_path) - history_before
+
+    return {
+        "interactions": {name: percentiles(samples) for name, samples in latencies.items() if samples},
+        "flow": {
+            "wall_s": wall_s,
+            "interactions_per_s": sum(map(len, latencies.values())) / wall_s,
+            "lost_downloads": sum(user.lost_downloads for user in users),
+        },
+        "memory": {
+            "rss_mb": rss_connected / 2**20,
+            "peak_rss_mb": max(peak[0], rss_connected) / 2**20,
+            "rss_per_session_kb": (rss_connected - rss_before) / sessions / 1024,
+            "history_db_per_session_kb": history_growth / sessions / 1024,
+        },
+    }
+
+
+def run_levels(path, levels, timeout, seed):
+    """One fresh server per session count, so earlier levels' sessions do not linger."""
+    results = {}
+    for sessions in levels:
+        with serve(path, timeout) as (process, port):
+            results[str(sessions)] = asyncio.run(load_server(process.pid, port, sessions, timeout, seed))
+    return results
+
+
+def session_state_sizes(path, sessions, timeout, seed):
+    """Deep size of each session_state entry after the flow, averaged over AppTest sessions."""
+    rng = np.random.default_rng(seed)
+    with remember_deferred_downloads() as downloads:
+        users = [AppTestSession(path, timeout, np.random.default_rng(rng.integers(2**32)), i, downloads)
+                 for i in range(sessions)]
+        for user in users:
+            for _, method in FLOW:
+                getattr(user, method)()
+    state = pd.DataFrame([user.state_sizes() for user in users])
+    return {
+        "entries_kb": {key: float(state[key].mean()) / 1024 for key in state.columns},
+        "total_kb": float(state.sum(axis=1).mean()) / 1024,
+    }
+
+
+def worst_p99(level):
+    return max(stats["p99_ms"] for stats in level["interactions"].values())
+
+
+def limits(levels, p99_threshold_ms, rss_threshold_mb):
+    """First session count of the sweep whose worst p99 or peak RSS crosses its threshold."""
+    def first(crosses):
+        return next((int(n) for n, level in levels.items() if crosses(level)), None)
+
+    return {
+        "p99_threshold_ms": p99_threshold_ms,
+        "p99_crossed_at_sessions": first(lambda level: worst_p99(level) > p99_threshold_ms),
+        "rss_threshold_mb": rss_threshold_mb,
+        "rss_crossed_at_sessions": first(lambda level: level["memory"]["peak_rss_mb"] > rss_threshold_mb),
+    }
+
+
+def flatten(tree, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only."""
+    flat = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Side-by-side table of every shared numeric result."""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    rows = [{"metric": k, "baseline": old[k], "current": new[k],
+             "change_%": (new[k] - old[k]) / old[k] * 100 if old[k] else float("nan")}
+            for k in new if k in old]
+    return pd.DataFrame(rows)
+
+
+def print_report(report):
+    meta, results = report["meta"], report["results"]
+    print(f"DiagnoX session benchmark · commit {meta['commit']} · sessions {' '.join(map(str, meta['sessions']))} · "
+          f"analyze delay {meta['analyze_delay_s']} s\n")
+    rows = {}
+    for n, level in results["levels"].items():
+        row = {f"{name} p99": stats["p99_ms"] for name, stats in level["interactions"].items()}
+        row["analyze p50"] = level["interactions"]["analyze"]["p50_ms"]
+        row["interactions/s"] = level["flow"]["interactions_per_s"]
+        row["lost PDFs"] = level["flow"]["lost_downloads"]
+        row["rss MB"] = level["memory"]["rss_mb"]
+        row["peak MB"] = level["memory"]["peak_rss_mb"]
+        row["KB/session"] = level["memory"]["rss_per_session_kb"]
+        row["history KB/session"] = level["memory"]["history_db_per_session_kb"]
+        rows[n] = row
+    table = pd.DataFrame(rows).T
+    table.index.name = "sessions"
+    print("Latencies in ms, all tabs connected at once:")
+    print(table.to_string(float_format=lambda v: f"{v:.1f}"))
+
+    top = meta["sessions"][-1]
+    lim = results["limits"]
+    for what, crossed, threshold in (("worst p99", lim["p99_crossed_at_sessions"], f"{lim['p99_threshold_ms']:g} ms"),
+                                     ("peak RSS", lim["rss_crossed_at_sessions"], f"{lim['rss_threshold_mb']:g} MB")):
+        if crossed is None:
+            print(f"✅ {what} stays under {threshold} up to {top} sessions")
+        else:
+            print(f"⚠️ {what} crosses {threshold} at {crossed} sessions")
+
+    state = results["session_state"]
+    print(f"\nsession_state per session: {state['total_kb']:.1f} KB")
+    for key, kb in state["entries_kb"].items():
+        print(f"  {key:<28}{kb:>8.2f} KB")
+    cold, throughput = results["cold_start"], results["throughput"]
+    print(f"Cold start (load_data): {cold['median_ms']:.1f} ms median, {cold['min_ms']:.1f} ms best")
+    print(f"Predict throughput: {throughput['single_rows_per_s']:,.0f} single rows/s, "
+          f"{throughput['batch_rows_per_s']:,.0f} rows/s in batches of {throughput['batch_rows']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app2.py with simulated concurrent sessions.")
+    parser.add_argument("--app", default="app2.py", help="app file or git:REV")
+    parser.add_argument("--bundle", default=os.environ.get("DIAGNOX_BUNDLE_PATH", DEFAULT_BUNDLE_PATH))
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 100],
+                        help="session counts to sweep, each against a fresh server")
+    parser.add_argument("--p99-threshold-ms", type=float, default=1000)
+    parser.add_argument("--rss-threshold-mb", type=float, default=1024)
+    parser.add_argument("--state-sessions", type=int, default=3, help="AppTest sessions for session_state sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--batch-rows", type=int, default=10000)
+    parser.add_argument("--throughput-seconds", type=float, default=1.0)
+    parser.add_argument("--analyze-delay", type=float, help="keep the app's analyzing pause (seconds)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON from an earlier run to compare against")
+    args = parser.parse_args(argv)
+    levels = sorted(set(args.sessions))
+    untested = check_streamlit()
+    # Read by app2.py on its first run, here and in the servers: no artificial
+    # pause unless asked for, and a throwaway history log unless one is given.
+    os.environ["DIAGNOX_ANALYZE_DELAY"] = str(args.analyze_delay or 0)
+    os.environ.setdefault("DIAGNOX_HISTORY_PATH",
+                          os.path.join(tempfile.mkdtemp(prefix="diagnox_bench_"), "history.db"))
+    os.environ["DIAGNOX_BUNDLE_PATH"] = args.bundle
+
+    label, path, temporary = materialize(args.app)
+    try:
+        results = {"levels": run_levels(path, levels, args.timeout, args.seed)}
+        results["session_state"] = session_state_sizes(path, args.state_sessions, args.timeout, args.seed)
+    finally:
+        if temporary:
+            os.remove(path)
+    results["limits"] = limits(results["levels"], args.p99_threshold_ms, args.rss_threshold_mb)
+    results["cold_start"] = cold_start_ms(args.bundle, args.cold_runs)
+    results["throughput"] = predict_throughput(args.bundle, args.batch_rows, args.throughput_seconds,
+                                               np.random.default_rng(args.seed))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "app": label,
+            "sessions": levels,
+            "analyze_delay_s": float(os.environ["DIAGNOX_ANALYZE_DELAY"]),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if untested:
+        print(f"⚠️ {untested}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.compare} (commit {baseline['meta'].get('commit')}):")
+        if baseline["meta"].get("streamlit") != streamlit.__version__:
+            print(f"⚠️ baseline ran on streamlit {baseline['meta'].get('streamlit')}, this run on {streamlit.__version__}")
+        print(compare(baseline, report).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    lost = {n: level["flow"]["lost_downloads"] for n, level in results["levels"].items()
+            if level["flow"]["lost_downloads"]}
+    if lost:
+        print("❌ PDF downloads lost before the tab could fetch them: "
+              + ", ".join(f"{count} at {n} sessions" for n, count in lost.items()), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
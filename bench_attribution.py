@@ -0,0 +1,113 @@
+import argparse
+import json
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from attribution import PathAttributor
+from forest_engine import FlatForest
+from inference import predict_proba
+from model_bundle import DEFAULT_MODEL_PATH
+from training_data import load_frame
+
+# --- Benchmark: Symptom Attribution Latency and Exactness ---
+# Explains real symptom rows with the sklearn model from --model and reports:
+#   sklearn paths:  a per-tree decision_path walk in Python (the naive way)
+#   flat walk:      PathAttributor.explain, every class at once
+#   batch:          PathAttributor.explain_batch rows/s for the top class
+# It also checks the additivity guarantee: baseline + contributions must equal
+# the model's predict_proba for every row and class (max |error| reported).
+# The exit code is non-zero if the error exceeds --tolerance.
+
+
+def sklearn_path_attribution(model, x):
+    """Reference Saabas attribution from sklearn's own decision paths."""
+    n_classes = len(model.classes_)
+    contributions = np.zeros((len(x), n_classes))
+    baseline = np.zeros(n_classes)
+    row = x.reshape(1, -1).astype(np.float32)
+    for est in model.estimators_:
+        tree = est.tree_
+        values = tree.value[:, 0, :n_classes]
+        values = values / values.sum(axis=1, keepdims=True)
+        path = est.decision_path(row).indices
+        baseline += values[path[0]]
+        for parent, child in zip(path[:-1], path[1:]):
+            contributions[tree.feature[parent]] += values[child] - values[parent]
+    return baseline / len(model.estimators_), contributions / len(model.estimators_)
+
+
+def median_ms(fn, rows, repeats):
+    samples = []
+    for _ in range(repeats):
+        for x in rows:
+            start = time.perf_counter()
+            fn(x)
+            samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time symptom attributions and check that they add up.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--data", default="Testing.csv", help="rows to explain")
+    parser.add_argument("--batch-rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    features = [str(c) for c in model.feature_names_in_]
+    X_frame, _ = load_frame(args.data)
+    X = X_frame[features].to_numpy(dtype=np.uint8)
+    attributor = PathAttributor(FlatForest.from_sklearn(model))
+    proba = predict_proba(model, X)
+
+    single_error = max(
+        float(np.abs(attributor.baseline + attributor.explain(x).sum(axis=0) - p).max()) for x, p in zip(X, proba))
+    reference_error = 0.0
+    for x in X[:5]:
+        baseline, contributions = sklearn_path_attribution(model, x)
+        reference_error = max(reference_error, float(np.abs(contributions - attributor.explain(x)).max()),
+                              float(np.abs(baseline - attributor.baseline).max()))
+
+    rng = np.random.default_rng(42)
+    batch = X[rng.integers(0, len(X), args.batch_rows)]
+    # Flip a couple of symptoms so the batch is not just a few repeated rows.
+    flips = rng.integers(0, X.shape[1], (args.batch_rows, 2))
+    batch[np.arange(args.batch_rows)[:, None], flips] ^= 1
+    batch_proba = predict_proba(model, batch)
+    top = batch_proba.argmax(axis=1)
+    start = time.perf_counter()
+    baselines, contributions = attributor.explain_batch(batch, top)
+    batch_s = time.perf_counter() - start
+    batch_error = float(np.abs(baselines + contributions.sum(axis=1) - batch_proba[np.arange(len(batch)), top]).max())
+
+    results = {
+        "trees": len(model.estimators_),
+        "classes": len(model.classes_),
+        "sklearn_paths_ms": median_ms(lambda x: sklearn_path_attribution(model, x), X[:10], 1),
+        "flat_walk_ms": median_ms(attributor.explain, X, args.repeats),
+        "batch_rows_per_s": args.batch_rows / batch_s,
+        "max_error_single": single_error,
+        "max_error_batch": batch_error,
+        "max_diff_vs_sklearn_paths": reference_error,
+    }
+    ok = max(single_error, batch_error, reference_error) <= args.tolerance
+
+    if args.json:
+        print(json.dumps({**results, "ok": ok}, indent=2))
+    else:
+        print(f"Attribution for a {results['trees']}-tree forest over {results['classes']} classes\n")
+        print(pd.Series(results).to_string(float_format=lambda v: f"{v:.6g}"))
+        print(f"\n{'✅' if ok else '❌'} attributions add up to predict_proba within {args.tolerance:g}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from case_index import CaseIndex
+from training_data import load_unique
+
+# --- Benchmark: Similar-Case Query Latency vs Case-Base Size ---
+# Grows the unique training cases into synthetic case bases of each --sizes
+# entry (random symptom flips of real cases, so counts stay realistic) and
+# times top-k Jaccard queries built from real cases:
+#   pandas:   Jaccard against every row of a 0/1 DataFrame (the naive scan)
+#   popcount: CaseIndex scanning every packed row
+#   pruned:   CaseIndex with symptom-count band pruning
+
+
+def synthetic_cases(X, y, size, rng, flips=2):
+    """`size` cases sampled from the real ones with up to `flips` symptoms toggled."""
+    picks = rng.integers(0, len(X), size)
+    cases = X[picks].copy()
+    for _ in range(flips):
+        rows = np.flatnonzero(rng.random(size) < 0.5)
+        cols = rng.integers(0, X.shape[1], len(rows))
+        cases[rows, cols] ^= 1
+    return cases, y[picks]
+
+
+def pandas_top_k(frame, query, k):
+    shared = frame.dot(query)
+    union = frame.sum(axis=1) + query.sum() - shared
+    return (shared / union.clip(lower=1)).nlargest(k)
+
+
+def median_ms(fn, queries, repeats):
+    samples = []
+    for _ in range(repeats):
+        for q in queries:
+            start = time.perf_counter()
+            fn(q)
+            samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time similar-case queries against case-base size.")
+    parser.add_argument("--train", default="Training.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--pandas-max-size", type=int, default=100000, help="skip the naive scan above this size")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    X_unique, y_unique, _ = load_unique(args.train)
+    features = X_unique.columns.tolist()
+    X, y = X_unique.to_numpy(dtype=np.uint8), y_unique.to_numpy()
+    rng = np.random.default_rng(42)
+    queries = [X[i] for i in rng.integers(0, len(X), args.queries)]
+
+    rows = []
+    for size in args.sizes:
+        cases, labels = synthetic_cases(X, y, size, rng)
+        start = time.perf_counter()
+        index = CaseIndex.from_matrix(cases, labels, features)
+        build_s = time.perf_counter() - start
+        result = {
+            "cases": size,
+            "unique_cases": len(index),
+            "index_kib": index.nbytes / 1024,
+            "build_s": build_s,
+            "popcount_ms": median_ms(lambda q: index.query(q, args.k, prune=False), queries, args.repeats),
+            "pruned_ms": median_ms(lambda q: index.query(q, args.k), queries, args.repeats),
+        }
+        if size <= args.pandas_max_size:
+            frame = pd.DataFrame(cases, columns=features).astype(np.int64)
+            result["pandas_ms"] = median_ms(lambda q: pandas_top_k(frame, q, args.k), queries, 1)
+        rows.append(result)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"Median top-{args.k} Jaccard query latency over {args.queries} queries\n")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
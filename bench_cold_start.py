@@ -0,0 +1,85 @@
+import argparse
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+# --- Benchmark: App Cold Start ---
+# Times what the app does before its first render, in a fresh interpreter per
+# run so nothing is cached in-process. Library imports are excluded; only the
+# data loading is timed. Peak RSS is reported for the whole child process.
+#   legacy:      pickle + medications.csv + Training.csv (the old load_data;
+#                unpickling also pays for importing sklearn)
+#   bundle:      memory-mapped model bundle
+#   bundle_copy: model bundle read fully into memory
+
+LOADERS = {
+    "legacy": """
+import pickle, pandas as pd
+t = time.perf_counter()
+with open(MODEL_PATH, "rb") as f:
+    model = pickle.load(f)
+medications_df = pd.read_csv("medications.csv")
+train_df = pd.read_csv("Training.csv").drop(columns=["Unnamed: 133"], errors="ignore")
+symptoms_list = sorted(train_df.drop("prognosis", axis=1).columns.tolist())
+""",
+    "bundle": """
+from model_bundle import load_bundle
+t = time.perf_counter()
+bundle = load_bundle(BUNDLE_PATH, mmap=True)
+""",
+    "bundle_copy": """
+from model_bundle import load_bundle
+t = time.perf_counter()
+bundle = load_bundle(BUNDLE_PATH, mmap=False)
+""",
+}
+
+CHILD_TEMPLATE = """
+import json, resource, time
+
+
+def peak_rss_kb():
+    # VmHWM resets on exec; ru_maxrss would inherit the parent's peak.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+MODEL_PATH, BUNDLE_PATH = {model_path!r}, {bundle_path!r}
+{body}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"seconds": elapsed, "max_rss_kb": peak_rss_kb()}}))
+"""
+
+
+def run_once(name, model_path, bundle_path):
+    code = CHILD_TEMPLATE.format(model_path=model_path, bundle_path=bundle_path, body=LOADERS[name])
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    from model_bundle import DEFAULT_BUNDLE_PATH, DEFAULT_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Measure app cold-start data loading.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'loader':<14}{'median':>12}{'min':>12}{'peak RSS':>14}")
+    for name in LOADERS:
+        runs = [run_once(name, args.model, args.bundle) for _ in range(args.runs)]
+        seconds = [r["seconds"] for r in runs]
+        rss_mb = np.median([r["max_rss_kb"] for r in runs]) / 1024
+        print(f"{name:<14}{np.median(seconds) * 1e3:>9.1f} ms{min(seconds) * 1e3:>9.1f} ms{rss_mb:>11.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import pickle
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+from training_data import deduplicate, load_frame
+
+# --- Benchmark: Training on Repeated vs Deduplicated Rows ---
+# Fits the production forest on the raw Training.csv rows and on the weighted
+# unique rows, and compares wall time, pickled size and Testing.csv accuracy.
+
+
+def fit_timed(X, y, sample_weight, n_estimators, seed):
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=seed)
+    start = time.perf_counter()
+    model.fit(X, y, sample_weight=sample_weight)
+    return model, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare training on raw vs deduplicated rows.")
+    parser.add_argument("--train", default="Training.csv")
+    parser.add_argument("--test", default="Testing.csv")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--seeds", type=int, default=3, help="number of random seeds to average over")
+    args = parser.parse_args(argv)
+
+    X_train, y_train = load_frame(args.train)
+    X_test, y_test = load_frame(args.test)
+    X_unique, y_unique, weights = deduplicate(X_train, y_train)
+    print(f"Dedup ratio: {len(X_train)} rows -> {len(X_unique)} unique ({len(X_train) / len(X_unique):.1f}x)\n")
+
+    variants = {"raw": (X_train, y_train, None), "deduplicated": (X_unique, y_unique, weights)}
+    print(f"{'variant':<14}{'rows':>7}{'fit time':>12}{'pickle':>12}{'accuracy':>11}")
+    for name, (X, y, w) in variants.items():
+        times, sizes, accuracies = [], [], []
+        for seed in range(args.seeds):
+            model, seconds = fit_timed(X, y, w, args.n_estimators, seed)
+            times.append(seconds)
+            sizes.append(len(pickle.dumps(model)))
+            accuracies.append(accuracy_score(y_test, model.predict(X_test)))
+        print(f"{name:<14}{len(X):>7}{np.median(times):>10.2f} s{np.median(sizes) / 1024:>8.0f} KiB{np.mean(accuracies) * 100:>10.2f}%")
+
+
+if __name__ == "__main__":
+    main()
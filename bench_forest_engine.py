@@ -0,0 +1,92 @@
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest_engine import FlatForest
+from inference import feature_order, predict_proba
+from model_bundle import DEFAULT_MODEL_PATH
+
+# --- Benchmark: sklearn predict_proba vs FlatForest ---
+# Checks that both paths agree on Testing.csv, then times single-row and batch
+# inference. Run with:  python bench_forest_engine.py
+
+
+def time_call(fn, repeats):
+    """Returns the median wall time of `fn` in seconds."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def unique_rows(X, n_rows, rng, flips=3):
+    """`n_rows` distinct rows made by flipping `flips` random symptoms of rows of X."""
+    rows = np.empty((0, X.shape[1]), dtype=np.uint8)
+    while len(rows) < n_rows:
+        batch = X[rng.integers(0, len(X), n_rows)]
+        batch[np.arange(n_rows)[:, None], rng.integers(0, X.shape[1], (n_rows, flips))] ^= 1
+        rows = np.unique(np.concatenate([rows, batch]), axis=0)
+    return rng.permutation(rows)[:n_rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare sklearn and flattened forest inference.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--test", default="Testing.csv")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--batch-rows", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    flat = FlatForest.from_sklearn(model)
+    test_df = pd.read_csv(args.test)
+    X = test_df[feature_order(model)].to_numpy(dtype=np.uint8)
+
+    expected = predict_proba(model, X)
+    actual = flat.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    identical = bool(np.array_equal(expected, actual))
+    single_ok = all(np.array_equal(expected[i:i + 1], flat.predict_proba(X[i:i + 1])) for i in range(len(X)))
+    print(f"Agreement on {len(X)} test rows: identical={identical} (row by row: {single_ok}), max |diff|={max_diff:.3e}")
+    print(f"Compiled {flat.n_estimators} trees, {len(flat.feature)} nodes, {len(flat.leaf_nodes)} leaves, {flat.nbytes / 1024:.0f} KiB")
+
+    row = X[:1]
+    # Tiled test rows repeat a few combinations, like real traffic. The unique
+    # batch flips a few symptoms of each test row until no row repeats, so
+    # predict_proba cannot skip any; random rows with the same symptom density
+    # are nearly all distinct too but look less like patients.
+    rng = np.random.default_rng(0)
+    batches = {
+        "repeated": np.resize(X, (args.batch_rows, X.shape[1])),
+        "unique": unique_rows(X, args.batch_rows, rng),
+        "random": (rng.random((args.batch_rows, X.shape[1])) < X.mean()).astype(np.uint8),
+    }
+    batch_repeats = max(3, args.repeats // 20)
+    results = {
+        "single_row": (
+            time_call(lambda: predict_proba(model, row), args.repeats),
+            time_call(lambda: flat.predict_proba(row), args.repeats),
+        ),
+    }
+    for name, batch in batches.items():
+        distinct = len(np.unique(batch, axis=0))
+        same = np.array_equal(predict_proba(model, batch), flat.predict_proba(batch))
+        print(f"Agreement on {args.batch_rows} {name} rows ({distinct} distinct): identical={same}")
+        results[f"{name}_{args.batch_rows}"] = (
+            time_call(lambda: predict_proba(model, batch), batch_repeats),
+            time_call(lambda: flat.predict_proba(batch), batch_repeats),
+        )
+
+    print(f"\n{'case':<16}{'sklearn':>14}{'flat':>14}{'speedup':>10}")
+    for case, (sk, fl) in results.items():
+        print(f"{case:<16}{sk * 1e3:>11.3f} ms{fl * 1e3:>11.3f} ms{sk / fl:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from history_store import HistoryStore
+
+# --- Benchmark: Analysis History Store at Scale ---
+# Fills a fresh history database with --rows synthetic analyses spread over
+# --days days and --sessions sessions through the write-behind queue, then
+# times what the app does with it:
+#   record:          UI-side cost of queueing one analysis
+#   page (session):  first page of one session's log
+#   page (disease):  a deep keyset page filtered by diagnosis
+#   daily counts:    30-day per-disease counts from the rollup table
+#   daily (scan):    the same counts with GROUP BY over the raw log
+
+
+def median_ms(fn, repeats=20):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e3
+
+
+def fill(store, rows, days, sessions, rng):
+    features = [f"s{i}" for i in range(132)]
+    diseases = [f"Disease {i}" for i in range(41)]
+    now = time.time()
+    created = np.sort(now - rng.random(rows) * days * 86400)
+    session_ids = rng.integers(0, sessions, rows)
+    disease_ids = rng.integers(0, len(diseases), rows)
+    bits = rng.integers(1, 2**62, rows)
+    start = time.perf_counter()
+    for i in range(rows):
+        # Retry instead of dropping when the bench outruns the writer.
+        while not store.record(f"session-{session_ids[i]}", features, int(bits[i]), "Moderate",
+                               [{"disease": diseases[disease_ids[i]], "probability": 0.6}], created_at=created[i]):
+            time.sleep(0.001)
+    store.flush()
+    return time.perf_counter() - start
+
+
+def record_latency_us(store, calls=2000):
+    """UI-side cost of record() while the writer keeps up (median)."""
+    features = [f"s{i}" for i in range(132)]
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        store.record("bench-ui", features, i + 1, "Mild", [{"disease": "Disease 0", "probability": 0.9}])
+        samples.append(time.perf_counter() - start)
+        if i % 100 == 99:
+            store.flush()
+    return float(np.median(samples)) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite history store at millions of rows.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.db")
+        store = HistoryStore(path)
+        fill_s = fill(store, args.rows, args.days, args.sessions, rng)
+        store.dropped = 0  # full-queue retries above are not losses
+        record_us = record_latency_us(store)
+
+        since = (pd.Timestamp.now() - pd.Timedelta(days=29)).strftime("%Y-%m-%d")
+        conn = store._reader()
+        deep_cursor = None
+        for _ in range(50):
+            _, deep_cursor = store.page(disease="Disease 7", before=deep_cursor, limit=10)
+        results = {
+            "rows": args.rows,
+            "db_mb": sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 2**20,
+            "insert_rows_per_s": args.rows / fill_s,
+            "record_us": record_us,
+            "page_session_ms": median_ms(lambda: store.page("session-7", limit=10)),
+            "page_disease_deep_ms": median_ms(lambda: store.page(disease="Disease 7", before=deep_cursor, limit=10)),
+            "daily_counts_rollup_ms": median_ms(lambda: store.daily_disease_counts(since_day=since)),
+            "daily_counts_scan_ms": median_ms(lambda: conn.execute(
+                "SELECT day, top_disease, COUNT(*) FROM analyses WHERE day >= ? GROUP BY day, top_disease",
+                (since,)).fetchall(), repeats=3),
+        }
+        store_stats = store.stats()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['rows']} analyses ({results['db_mb']:.0f} MB): "
+          f"{results['insert_rows_per_s']:.0f} rows/s through the write-behind queue, "
+          f"{results['record_us']:.1f} µs per record() call; writer stats {store_stats}\n")
+    for key in ("page_session_ms", "page_disease_deep_ms", "daily_counts_rollup_ms", "daily_counts_scan_ms"):
+        print(f"{key:<26}{results[key]:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
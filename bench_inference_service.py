@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from training_data import load_frame
+
+# --- Load Generator: Inference Service Batching ---
+# Starts inference_service.py once per batching window and drives it with
+# --concurrency keep-alive connections, each sending symptom lists taken from
+# Testing.csv back to back. Reports throughput, p50/p99 latency and the
+# average batch size the service formed. A window of 0 is batching off.
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def symptom_payloads(path, limit=1000):
+    """Encoded request bodies built from the rows of a labelled symptom file."""
+    X, _ = load_frame(path)
+    columns = np.asarray(X.columns)
+    return [json.dumps({"symptoms": columns[row > 0].tolist()}).encode("utf-8")
+            for row in X.to_numpy()[:limit] if row.any()]
+
+
+async def request(reader, writer, method, path, body=b""):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    payload = await reader.readexactly(length)
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}: {payload[:200]!r}")
+    return payload
+
+
+async def client(port, payloads, n_requests, offset, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for i in range(n_requests):
+            body = payloads[(offset + i) % len(payloads)]
+            start = time.perf_counter()
+            await request(reader, writer, "POST", "/predict", body)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def drive(port, payloads, concurrency, n_requests):
+    latencies = []
+    per_client = max(1, n_requests // concurrency)
+    # Warm-up so connection setup and first-call costs are not measured.
+    await asyncio.gather(*(client(port, payloads, 5, c, []) for c in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, payloads, per_client, c * 97, latencies) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    health = json.loads(await request(reader, writer, "GET", "/health"))
+    writer.close()
+    return latencies, elapsed, health
+
+
+def wait_ready(port, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("inference_service.py exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError("inference_service.py did not start in time")
+
+
+def run_mode(window_ms, args, payloads):
+    port = free_port()
+    cmd = [sys.executable, "inference_service.py", "--port", str(port), "--batch-window-ms", str(window_ms),
+           "--max-batch", str(args.max_batch)]
+    if args.bundle:
+        cmd += ["--bundle", args.bundle]
+    process = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        wait_ready(port, process)
+        latencies, elapsed, health = asyncio.run(drive(port, payloads, args.concurrency, args.requests))
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = np.asarray(latencies) * 1e3
+    return {
+        "window_ms": window_ms,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_batch": health["rows"] / max(health["batches"], 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the inference service with batching on and off.")
+    parser.add_argument("--data", default="Testing.csv", help="labelled symptom file used for request bodies")
+    parser.add_argument("--bundle", help="bundle to serve (defaults to the service's default)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 2.0, 5.0],
+                        help="batching windows in ms to compare; 0 is batching off")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    payloads = symptom_payloads(args.data)
+    rows = [run_mode(window, args, payloads) for window in args.windows]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{args.requests} requests, {args.concurrency} concurrent connections\n")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
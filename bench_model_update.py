@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+
+from bench_case_index import synthetic_cases
+from case_index import CaseIndex
+from model_training import RANDOM_STATE, fit_final
+from model_update import full_retrain, sample_replay, warm_start_update
+from packed_dataset import PackedStore
+from symptom_recommender import rates_from_counts
+from training_data import deduplicate, load_unique
+
+# --- Benchmark: Incremental Update vs Full Retrain as Data Grows ---
+# Grows the unique training cases into noisy synthetic stores of each --sizes
+# entry (random symptom flips, as in bench_case_index) and, per size, times
+# every step model_update.py takes for a --batch of new confirmed cases:
+#   append:       staging the batch as a new store segment (both modes)
+#   load:         incremental reads a stratified replay sample from the store's
+#                 memory maps; full deduplicates the whole store
+#   fit:          warm-starting --new-trees trees and retiring as many old
+#                 ones, vs refitting the whole forest
+#   publish:      symptom rates from segment counts plus the case index
+#                 (extended vs rebuilt)
+# The speedup compares end-to-end totals. Holdout accuracy of both models is
+# measured on fresh noisy cases.
+
+
+def noisy_cases(X, y, size, rng):
+    cases, labels = synthetic_cases(X, y, size, rng)
+    return cases, labels.astype(object)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare incremental model updates with full retraining.")
+    parser.add_argument("--train", default="Training.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000, 200000])
+    parser.add_argument("--batch", type=int, default=500, help="new confirmed cases per update")
+    parser.add_argument("--holdout", type=int, default=5000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--new-trees", type=int, default=10)
+    parser.add_argument("--replay-rows", type=int, default=5000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    X_unique, y_unique, _ = load_unique(args.train)
+    features = X_unique.columns.tolist()
+    X, y = X_unique.to_numpy(dtype=np.uint8), y_unique.to_numpy()
+    rng = np.random.default_rng(42)
+    X_holdout, y_holdout = noisy_cases(X, y, args.holdout, rng)
+    holdout_frame = pd.DataFrame(X_holdout, columns=features)
+    params = {"n_estimators": args.n_estimators, "max_depth": None, "max_features": "sqrt"}
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            store = PackedStore(os.path.join(directory, f"store_{size}"))
+            X_store, y_store = noisy_cases(X, y, size, rng)
+            store.append(X_store, y_store, features)
+            X_new, y_new = noisy_cases(X, y, args.batch, rng)
+            # The published model and case index before the update, built without the batch.
+            X_old, y_old, w_old = deduplicate(X_store, y_store)
+            model = fit_final(params, pd.DataFrame(X_old, columns=features), y_old, w_old)
+            previous_cases = CaseIndex.from_matrix(X_old, y_old, features, w_old)
+
+            timings = {}
+            start = time.perf_counter()
+            store.stage(X_new, y_new, features)
+            timings["append_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            X_all, y_all, w_all = store.unique_rows()
+            timings["full_load_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            full = full_retrain(model, X_all, y_all, w_all, features)
+            timings["full_fit_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            rates_from_counts(*store.symptom_counts(full.classes_))
+            CaseIndex.from_matrix(X_all, y_all, features, w_all)
+            timings["full_publish_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            X_batch, y_batch, w_batch = deduplicate(X_new, y_new)
+            X_replay, y_replay, w_replay = sample_replay(
+                store, args.replay_rows, np.random.default_rng(RANDOM_STATE + len(model.estimators_)))
+            timings["incremental_load_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            incremental = warm_start_update(model, X_batch, y_batch, w_batch, X_replay, y_replay, w_replay,
+                                            new_trees=args.new_trees)
+            timings["incremental_fit_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            rates_from_counts(*store.symptom_counts(incremental.classes_))
+            previous_cases.extend(X_new, y_new)
+            timings["incremental_publish_s"] = time.perf_counter() - start
+            store.commit()
+
+            full_s = timings["append_s"] + timings["full_load_s"] + timings["full_fit_s"] + timings["full_publish_s"]
+            incremental_s = (timings["append_s"] + timings["incremental_load_s"] + timings["incremental_fit_s"]
+                             + timings["incremental_publish_s"])
+            rows.append({
+                "store_rows": len(store),
+                "unique_rows": len(X_all),
+                **timings,
+                "full_s": full_s,
+                "incremental_s": incremental_s,
+                "speedup": full_s / incremental_s,
+                "full_accuracy": accuracy_score(y_holdout, full.predict(holdout_frame)),
+                "incremental_accuracy": accuracy_score(y_holdout, incremental.predict(holdout_frame)),
+            })
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"Update with {args.batch} new cases: full refit ({args.n_estimators} trees) vs warm start "
+          f"(+{args.new_trees}/-{args.new_trees} trees, {args.replay_rows} replay rows)\n")
+    print(pd.DataFrame(rows).set_index("store_rows").T.to_string(float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from packed_dataset import convert_csv
+
+# --- Benchmark: CSV vs Bit-Packed Dataset Loading ---
+# Tiles Training.csv up to --rows rows, converts it to .dxb and times each
+# loader in a fresh interpreter, reporting wall time and peak RSS.
+#   csv:           pd.read_csv of the whole file (int64 columns)
+#   packed_full:   memory-map and unpack every row at once
+#   packed_chunks: memory-map and walk the file in 100k-row chunks
+#   packed_unique: deduplicate in packed form, unpack unique rows only
+
+LOADERS = {
+    "csv": "df = pd.read_csv(PATH_CSV)",
+    "packed_full": "d = PackedDataset(PATH_DXB); X = d.unpack(); y = d.labels()",
+    "packed_chunks": "d = PackedDataset(PATH_DXB)\nfor X, y in d.iter_chunks(100000): X.sum()",
+    "packed_unique": "d = PackedDataset(PATH_DXB); X, y, w = d.unique_rows()",
+}
+
+CHILD_TEMPLATE = """
+import json, resource, time
+import pandas as pd
+from packed_dataset import PackedDataset
+
+
+def peak_rss_kb():
+    # VmHWM resets on exec; ru_maxrss would inherit the parent's peak.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+PATH_CSV, PATH_DXB = {csv!r}, {dxb!r}
+t = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"seconds": elapsed, "max_rss_kb": peak_rss_kb()}}))
+"""
+
+
+def make_inputs(source, rows, directory):
+    """Writes a tiled CSV of `rows` rows and its packed conversion."""
+    df = pd.read_csv(source)
+    repeats = int(np.ceil(rows / len(df)))
+    csv_path = os.path.join(directory, "tiled.csv")
+    pd.concat([df] * repeats, ignore_index=True).iloc[:rows].to_csv(csv_path, index=False)
+    dxb_path = os.path.join(directory, "tiled.dxb")
+    start = time.perf_counter()
+    convert_csv(csv_path, dxb_path)
+    return csv_path, dxb_path, time.perf_counter() - start
+
+
+def run_once(name, csv_path, dxb_path):
+    code = CHILD_TEMPLATE.format(csv=csv_path, dxb=dxb_path, body=LOADERS[name])
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare CSV and bit-packed dataset loading.")
+    parser.add_argument("--source", default="Training.csv")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path, dxb_path, convert_seconds = make_inputs(args.source, args.rows, directory)
+        print(f"{args.rows} rows: CSV {os.path.getsize(csv_path) / 2**20:.1f} MB, "
+              f"packed {os.path.getsize(dxb_path) / 2**20:.1f} MB (converted in {convert_seconds:.2f}s)\n")
+        print(f"{'loader':<16}{'median':>12}{'peak RSS':>14}")
+        for name in LOADERS:
+            runs = [run_once(name, csv_path, dxb_path) for _ in range(args.runs)]
+            seconds = np.median([r["seconds"] for r in runs])
+            rss_mb = np.median([r["max_rss_kb"] for r in runs]) / 1024
+            print(f"{name:<16}{seconds * 1e3:>9.1f} ms{rss_mb:>11.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+# --- Rerun-Cost Report ---
+# Drives the input form through a typical analysis with Streamlit's AppTest
+# and times each script execution. Each interaction is marked with whether
+# it reruns the script in a browser. Widgets inside an st.form only send
+# their values on submit, so their changes do not rerun. The flow cost is
+# the script time a user actually waits for across the whole interaction.
+#
+# Compare app versions by passing several --apps; "git:REV" benchmarks
+# app2.py as of that revision, e.g.
+#   python bench_reruns.py --apps git:HEAD~1 app2.py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SYMPTOM_PICKS = ["itching", "skin_rash", "chills"]
+
+
+def materialize(spec):
+    """Returns (label, path, is_temporary) for a path or a git:REV spec."""
+    if not spec.startswith("git:"):
+        return spec, os.path.abspath(spec), False
+    rev = spec[4:]
+    source = subprocess.run(["git", "show", f"{rev}:app2.py"], cwd=HERE, capture_output=True, check=True).stdout
+    # Written next to app2.py so its sibling imports resolve.
+    path = os.path.join(HERE, f".bench_app2_{rev.replace('~', '_').replace('/', '_')}.py")
+    with open(path, "wb") as f:
+        f.write(source)
+    return spec, path, True
+
+
+def reruns_in_browser(widget):
+    """Form members wait for submit; the submit button itself reruns."""
+    if getattr(widget.proto, "is_form_submitter", False):
+        return 1
+    return 0 if widget.proto.form_id else 1
+
+
+def multiselect_with(at, symptom):
+    return next(m for m in at.multiselect if symptom in m.options)
+
+
+def run_flow(path, timeout):
+    """One analysis from page load to results; returns per-interaction timings.
+
+    Widgets inside a form are only set, not run: the browser keeps their
+    pending values until submit and never executes the script for them.
+    """
+    steps = []
+
+    def interact(name, widget, change):
+        change()
+        reruns = 1 if widget is None else reruns_in_browser(widget)
+        elapsed = 0.0
+        if reruns:
+            start = time.perf_counter()
+            at.run()
+            elapsed = time.perf_counter() - start
+            if at.exception:
+                raise RuntimeError(f"{name}: {at.exception}")
+        steps.append({"interaction": name, "script_ms": elapsed * 1e3, "browser_reruns": reruns})
+
+    at = AppTest.from_file(path, default_timeout=timeout)
+    interact("page load", None, lambda: None)
+    name_input = at.text_input[0]
+    interact("type name", name_input, lambda: name_input.input("Jane Doe"))
+    age_input = at.number_input[0]
+    interact("set age", age_input, lambda: age_input.set_value(30))
+    for symptom in SYMPTOM_PICKS:
+        picker = multiselect_with(at, symptom)
+        interact(f"select {symptom}", picker, lambda: picker.select(symptom))
+    slider = at.select_slider[0]
+    interact("set severity", slider, lambda: slider.set_value("Mild"))
+    submit = next(b for b in at.button if b.label == "Analyze Symptoms")
+    interact("analyze (incl. 1.5 s delay)", submit, submit.click)
+    if not at.session_state.analysis_results:
+        raise RuntimeError("the flow did not produce results")
+    return steps
+
+
+def measure(spec, runs, timeout):
+    label, path, temporary = materialize(spec)
+    try:
+        flows = [run_flow(path, timeout) for _ in range(runs)]
+    finally:
+        if temporary:
+            os.remove(path)
+    rows = []
+    for i, step in enumerate(flows[0]):
+        script_ms = float(np.median([flow[i]["script_ms"] for flow in flows]))
+        rows.append({"app": label, "interaction": step["interaction"], "script_ms": script_ms,
+                     "browser_reruns": step["browser_reruns"], "cost_ms": script_ms * step["browser_reruns"]})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure script execution time per form interaction.")
+    parser.add_argument("--apps", nargs="+", default=["app2.py"], help="app files or git:REV specs to compare")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    rows = [row for spec in args.apps for row in measure(spec, args.runs, args.timeout)]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    table = pd.DataFrame(rows)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    summary = table.groupby("app", sort=False).agg(reruns=("browser_reruns", "sum"), flow_cost_ms=("cost_ms", "sum"))
+    print("\nPer analysis (page load to results):")
+    print(summary.to_string(float_format=lambda v: f"{v:.1f}"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import gc
+import logging
+import pickle
+import resource
+
+import pandas as pd
+import streamlit as st
+
+from model_bundle import DEFAULT_BUNDLE_PATH, DEFAULT_MODEL_PATH
+from model_store import ModelStore
+
+# --- Benchmark: Per-Session Model Memory ---
+# Simulates N concurrent sessions, each holding what one rerun of app2.py gets
+# from load_data(), and reports the extra memory per session.
+#   cache_data:     the old loader; every call returns a fresh unpickled copy
+#                   of the forest and the DataFrames
+#   cache_resource: the shared ModelStore; every call returns the same snapshot
+
+logging.getLogger("streamlit").setLevel(logging.CRITICAL)
+
+
+def make_loaders(model_path, bundle_path):
+    @st.cache_data
+    def load_data_copied():
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        medications_df = pd.read_csv("medications.csv")
+        train_df = pd.read_csv("Training.csv").drop(columns=["Unnamed: 133"], errors="ignore")
+        symptoms_list = sorted(train_df.drop("prognosis", axis=1).columns.tolist())
+        return model, medications_df, symptoms_list
+
+    @st.cache_resource
+    def load_data_shared():
+        return ModelStore(bundle_path)
+
+    return {
+        "cache_data": load_data_copied,
+        "cache_resource": lambda: load_data_shared().current(),
+    }
+
+
+def resident_bytes():
+    """Current RSS from /proc on Linux, else the peak RSS from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def per_session_bytes(loader, sessions):
+    # RSS rather than tracemalloc: sklearn's tree nodes live in C buffers
+    # that tracemalloc does not see.
+    loader()  # warm the cache, as the first session would
+    gc.collect()
+    baseline = resident_bytes()
+    held = [loader() for _ in range(sessions)]
+    used = resident_bytes() - baseline
+    del held
+    gc.collect()
+    return used / sessions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-session memory of the model loader.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'loader':<16}{'per session':>16}{f'x{args.sessions} sessions':>18}")
+    for name, loader in make_loaders(args.model, args.bundle).items():
+        per_session = per_session_bytes(loader, args.sessions)
+        print(f"{name:<16}{per_session / 1024:>13.1f} KB{per_session * args.sessions / 2**20:>15.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from inference import encode_symptom_lists
+
+# --- Similar-Case Index ---
+# Nearest known cases for a symptom selection. Each unique (symptoms,
+# prognosis) row of the training data is stored once as packed 64-bit words
+# (132 symptoms -> 3 words) with its symptom count and how many training rows
+# it stands for. A query ANDs/XORs its words against every stored row and
+# counts bits with a vectorized popcount, so comparing against the whole case
+# base is a few array operations instead of a pandas scan.
+#
+# Rows are kept sorted by symptom count, which bounds both metrics:
+#   hamming(a, b) >= | |a| - |b| |
+#   jaccard(a, b) <= min(|a|, |b|) / max(|a|, |b|)
+# so a top-k query scans a widening band of counts around the query's and
+# stops once no row outside the band could beat the current k-th result.
+
+METRICS = ("jaccard", "hamming")
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        bytes_ = np.ascontiguousarray(words).view(np.uint8).reshape(*words.shape, 8)
+        return _BYTE_POPCOUNT[bytes_].sum(axis=-1, dtype=np.uint8)
+
+
+def pack_rows(X):
+    """Packs 0/1 rows into uint64 words, padding each row to a whole word."""
+    packed = np.packbits(np.asarray(X, dtype=np.uint8), axis=1)
+    n_words = max(1, -(-packed.shape[1] // 8))
+    padded = np.zeros((len(packed), n_words * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view(np.uint64)
+
+
+class CaseIndex:
+    """Top-k Jaccard / Hamming search over the unique training cases."""
+
+    def __init__(self, words, counts, labels, multiplicity, features):
+        self.words = words
+        self.counts = counts
+        self.labels = labels
+        self.multiplicity = multiplicity
+        self.features = list(features)
+        # Start offset of each symptom count in the count-sorted rows.
+        self.count_offsets = np.searchsorted(counts, np.arange(len(self.features) + 2))
+
+    @classmethod
+    def from_matrix(cls, X, y, features, sample_weight=None):
+        """Builds the index from 0/1 rows and labels, merging duplicate cases."""
+        X = np.asarray(X, dtype=np.uint8)
+        weights = np.ones(len(X)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        return cls._from_words(pack_rows(X), y, weights, features)
+
+    def extend(self, X, y, sample_weight=None):
+        """Returns a new index with more cases merged into this one's."""
+        X = np.asarray(X, dtype=np.uint8)
+        weights = np.ones(len(X)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        return self._from_words(
+            np.concatenate([self.words, pack_rows(X)]),
+            np.concatenate([self.labels, np.asarray(y, dtype=object)]),
+            np.concatenate([self.multiplicity, weights]),
+            self.features,
+        )
+
+    @classmethod
+    def _from_words(cls, words, y, weights, features):
+        label_codes, label_names = pd.factorize(np.asarray(y, dtype=object))
+        keys = np.concatenate([words.view(np.uint8), label_codes.astype("<i4").view(np.uint8).reshape(-1, 4)], axis=1)
+        group, _ = pd.factorize(keys.view(np.dtype((np.void, keys.shape[1]))).ravel())
+        _, first = np.unique(group, return_index=True)
+        multiplicity = np.bincount(group, weights=weights)
+
+        counts = popcount(words[first]).sum(axis=1).astype(np.int16)
+        order = np.argsort(counts, kind="stable")
+        rows = first[order]
+        return cls(
+            words=np.ascontiguousarray(words[rows]),
+            counts=counts[order],
+            labels=np.asarray(label_names, dtype=object)[label_codes[rows]],
+            multiplicity=multiplicity[order],
+            features=features,
+        )
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes + self.counts.nbytes + self.multiplicity.nbytes
+
+    def _scores(self, query_words, query_count, start, stop, metric):
+        shared = popcount(self.words[start:stop] & query_words).sum(axis=1, dtype=np.int32)
+        counts = self.counts[start:stop].astype(np.int32)
+        if metric == "hamming":
+            return shared, counts + query_count - 2 * shared
+        union = counts + query_count - shared
+        return shared, np.where(union > 0, shared / np.maximum(union, 1), 1.0)
+
+    def _band(self, query_count, width):
+        lo = max(0, query_count - width)
+        hi = min(len(self.features), query_count + width)
+        return int(self.count_offsets[lo]), int(self.count_offsets[hi + 1]), lo, hi
+
+    def _bound(self, query_count, lo, hi, metric):
+        """Best score any row with a count outside [lo, hi] could reach."""
+        outside = [c for c in (lo - 1, hi + 1) if 0 <= c <= len(self.features)]
+        if not outside:
+            return None
+        if metric == "hamming":
+            return min(abs(c - query_count) for c in outside)
+        return max(min(c, query_count) / max(c, query_count, 1) for c in outside)
+
+    def query(self, symptoms, k=5, metric="jaccard", prune=True):
+        """Returns the k nearest cases to a symptom list (or 0/1 row), best first."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {METRICS}.")
+        if isinstance(symptoms, np.ndarray):
+            row = symptoms.astype(np.uint8)
+        else:
+            row = encode_symptom_lists([list(symptoms)], self.features)[0]
+        query_words = pack_rows(row[None, :])[0]
+        query_count = int(row.sum())
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+
+        # k <= len(self), so the loop always ends by the time the band is everything.
+        width = 0 if prune else len(self.features)
+        while True:
+            start, stop, lo, hi = self._band(query_count, width)
+            shared, scores = self._scores(query_words, query_count, start, stop, metric)
+            bound = self._bound(query_count, lo, hi, metric)
+            if len(scores) >= k:
+                # Hamming: smaller is better; Jaccard: larger is better.
+                keyed = scores if metric == "hamming" else -scores
+                top = np.argpartition(keyed, k - 1)[:k]
+                top = top[np.argsort(keyed[top], kind="stable")]
+                kth = scores[top[-1]]
+                if bound is None or (kth <= bound if metric == "hamming" else kth >= bound):
+                    break
+            width = max(1, width * 2)
+
+        rows = start + top
+        bits = np.unpackbits(self.words[rows].view(np.uint8), axis=1, count=len(self.features))
+        return [
+            {
+                "prognosis": self.labels[r],
+                metric: float(scores[i]) if metric == "jaccard" else int(scores[i]),
+                "shared_symptoms": int(shared[i]),
+                "training_rows": int(self.multiplicity[r]),
+                "symptoms": [f for f, b in zip(self.features, case_bits) if b],
+            }
+            for i, r, case_bits in zip(top, rows, bits)
+        ]
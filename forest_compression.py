@@ -0,0 +1,309 @@
+import argparse
+import time
+
+import numpy as np
+
+from forest_engine import FlatForest
+from inference import top_k_indices
+from model_bundle import DEFAULT_BUNDLE_PATH, load_bundle, save_bundle
+from training_data import load_frame, load_unique
+
+# --- Forest Compression ---
+# Shrinks a FlatForest in stages, checking an accuracy guardrail after every
+# lossy step and stopping at the last step that still passes:
+#   1. drop trees greedily, always removing the tree the ensemble misses least
+#   2. cap tree depth (nodes at the cap become leaves with their class mix)
+#   3. merge identical subtrees across all trees (lossless)
+#   4. store nodes in the smallest dtypes that fit: uint8 split features,
+#      uint16 child ids, then float32 and finally uint8-quantized probabilities
+# The guardrail is accuracy on the labelled evaluation rows plus top-3
+# agreement with the uncompressed model on all evaluation rows. Agreement only
+# compares the reference's top-3 slots with non-zero probability; the rest are
+# ties at 0% whose order is arbitrary.
+
+QUANT_LEVELS = 255
+
+
+def reference_top3(proba):
+    """The reference ranking: top-3 class indices and how many have p > 0."""
+    top3 = top_k_indices(proba, 3)
+    n_nonzero = (np.take_along_axis(proba, top3, axis=1) > 0).sum(axis=1)
+    return top3, n_nonzero
+
+
+def evaluate(proba, reference, y_true, label_mask, classes):
+    """Accuracy on labelled rows and top-3 agreement with the reference model."""
+    ref_top3, n_nonzero = reference
+    top3 = top_k_indices(proba, 3)
+    agree = np.zeros(len(proba), dtype=bool)
+    for k in (1, 2, 3):
+        rows = n_nonzero == k
+        same = np.all(np.sort(top3[rows, :k], axis=1) == np.sort(ref_top3[rows, :k], axis=1), axis=1)
+        agree[rows] = same
+    agreement = float(np.mean(agree))
+    predicted = classes[np.argmax(proba[label_mask], axis=1)]
+    accuracy = float(np.mean(predicted == y_true[label_mask])) if label_mask.any() else 1.0
+    return accuracy, agreement
+
+
+def rebuild(flat, roots, max_depth=None):
+    """Copies the trees under `roots` into fresh compact arrays.
+
+    With `max_depth`, nodes at that depth become leaves keeping their own
+    class distribution (every node carries one, not just the leaves).
+    """
+    is_leaf = flat.is_leaf
+    new_ids, order = {}, []
+    for root in roots:
+        stack = [(int(root), 0)]
+        while stack:
+            node, depth = stack.pop()
+            key = (node, depth) if max_depth is not None else node
+            if key in new_ids:
+                continue
+            new_ids[key] = len(order)
+            order.append((node, depth))
+            if not is_leaf[node] and (max_depth is None or depth < max_depth):
+                stack.extend((int(c), depth + 1) for c in flat.children[node])
+
+    def new_id(node, depth):
+        return new_ids[(node, depth) if max_depth is not None else node]
+
+    feature = np.zeros(len(order), dtype=np.int32)
+    children = np.zeros((len(order), 2), dtype=np.int32)
+    for i, (node, depth) in enumerate(order):
+        if is_leaf[node] or (max_depth is not None and depth >= max_depth):
+            children[i] = i
+        else:
+            feature[i] = flat.feature[node]
+            children[i] = [new_id(int(c), depth + 1) for c in flat.children[node]]
+    nodes = [node for node, _ in order]
+    return FlatForest(
+        feature=feature,
+        children=children,
+        values=np.ascontiguousarray(flat.values[nodes]),
+        roots=np.array([new_id(int(r), 0) for r in roots], dtype=np.int32),
+        classes=flat.classes_,
+        feature_names=getattr(flat, "feature_names_in_", None),
+        value_scale=flat.value_scale,
+    )
+
+
+def merge_subtrees(flat):
+    """Shares identical subtrees (same splits and node values) between all trees."""
+    is_leaf = flat.is_leaf
+    canonical, keys = {}, {}
+    n_nodes = len(flat.children)
+    canon_of = np.full(n_nodes, -1, dtype=np.int64)
+
+    # Post-order over every tree so children are canonicalized before parents.
+    for root in flat.roots:
+        stack = [(int(root), False)]
+        while stack:
+            node, expanded = stack.pop()
+            if canon_of[node] >= 0:
+                continue
+            if not is_leaf[node] and not expanded:
+                stack.append((node, True))
+                stack.extend((int(c), False) for c in flat.children[node] if canon_of[c] < 0)
+                continue
+            if is_leaf[node]:
+                key = (-1, -1, -1, flat.values[node].tobytes())
+            else:
+                c0, c1 = flat.children[node]
+                key = (int(flat.feature[node]), int(canon_of[c0]), int(canon_of[c1]), flat.values[node].tobytes())
+            if key not in canonical:
+                canonical[key] = len(canonical)
+                keys[canonical[key]] = (key, node)
+            canon_of[node] = canonical[key]
+
+    n = len(canonical)
+    feature = np.zeros(n, dtype=np.int32)
+    children = np.zeros((n, 2), dtype=np.int32)
+    source = np.zeros(n, dtype=np.int64)
+    for cid, ((f, c0, c1, _), node) in keys.items():
+        source[cid] = node
+        if f < 0:
+            children[cid] = cid
+        else:
+            feature[cid] = f
+            children[cid] = (c0, c1)
+    return FlatForest(
+        feature=feature,
+        children=children,
+        values=np.ascontiguousarray(flat.values[source]),
+        roots=canon_of[flat.roots].astype(np.int32),
+        classes=flat.classes_,
+        feature_names=getattr(flat, "feature_names_in_", None),
+        value_scale=flat.value_scale,
+    )
+
+
+def shrink_dtypes(flat, values="float32"):
+    """Narrows node arrays; `values` is 'float64', 'float32' or 'uint8' (quantized)."""
+    n_nodes = len(flat.children)
+    feature_dtype = np.uint8 if flat.feature.max(initial=0) < 256 else np.uint16
+    child_dtype = np.uint16 if n_nodes < 2**16 else np.uint32
+    scale = flat.value_scale
+    node_values = flat.values if scale is None else flat.values * scale
+    if values == "uint8":
+        node_values, scale = np.rint(node_values * QUANT_LEVELS).astype(np.uint8), 1.0 / QUANT_LEVELS
+    else:
+        node_values, scale = node_values.astype(values), None
+    return FlatForest(
+        feature=flat.feature.astype(feature_dtype),
+        children=flat.children.astype(child_dtype),
+        values=np.ascontiguousarray(node_values),
+        roots=flat.roots.astype(child_dtype),
+        classes=flat.classes_,
+        feature_names=getattr(flat, "feature_names_in_", None),
+        value_scale=scale,
+    )
+
+
+def tree_depths(flat):
+    """Depth of each tree, counted in splits."""
+    is_leaf = flat.is_leaf
+    depths = []
+    for root in flat.roots:
+        deepest, stack = 0, [(int(root), 0)]
+        while stack:
+            node, depth = stack.pop()
+            deepest = max(deepest, depth)
+            if not is_leaf[node]:
+                stack.extend((int(c), depth + 1) for c in flat.children[node])
+        depths.append(deepest)
+    return depths
+
+
+def single_row_latency_ms(flat, row, repeats=200):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        flat.predict_proba(row)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e3
+
+
+def compress_forest(flat, X_eval, y_eval, min_accuracy=0.97, min_top3_agreement=0.99, min_trees=1):
+    """Runs every compression stage under the guardrail.
+
+    `y_eval` may contain None for rows used only for top-3 agreement.
+    Returns the compressed forest and a list of per-stage report rows.
+    """
+    flat = rebuild(flat, flat.roots)  # current array layout, so sizes compare fairly
+    X_eval = np.asarray(X_eval, dtype=np.uint8)
+    y_eval = np.asarray(y_eval, dtype=object)
+    label_mask = np.array([y is not None for y in y_eval])
+    classes = np.asarray(flat.classes_)
+    reference = reference_top3(flat.predict_proba(X_eval))
+
+    def check(candidate):
+        return evaluate(candidate.predict_proba(X_eval), reference, y_eval, label_mask, classes)
+
+    def passes(metrics):
+        return metrics[0] >= min_accuracy and metrics[1] >= min_top3_agreement
+
+    report = []
+
+    def record(stage, forest, metrics):
+        report.append({
+            "stage": stage,
+            "trees": forest.n_estimators,
+            "nodes": len(forest.children),
+            "kib": forest.nbytes / 1024,
+            "predict_ms": single_row_latency_ms(forest, X_eval[:1]),
+            "accuracy": metrics[0],
+            "top3_agreement": metrics[1],
+        })
+
+    record("original", flat, check(flat))
+
+    # 1. Greedy tree dropping on cached per-tree probabilities.
+    leaves = flat.apply(X_eval)
+    per_tree = np.stack([flat.values[leaves[:, t]] for t in range(flat.n_estimators)]).astype(np.float64)
+    if flat.value_scale is not None:
+        per_tree *= flat.value_scale
+    full = per_tree.mean(axis=0)
+    kept = list(range(flat.n_estimators))
+    total = per_tree.sum(axis=0)
+    while len(kept) > min_trees:
+        best = None
+        for t in kept:
+            proba = (total - per_tree[t]) / (len(kept) - 1)
+            metrics = evaluate(proba, reference, y_eval, label_mask, classes)
+            score = (metrics[1], metrics[0], -np.abs(proba - full).sum())
+            if best is None or score > best[0]:
+                best = (score, t, metrics)
+        if not passes(best[2]):
+            break
+        kept.remove(best[1])
+        total -= per_tree[best[1]]
+    forest = rebuild(flat, flat.roots[sorted(kept)])
+    record("drop_trees", forest, check(forest))
+
+    # 2. Lower the depth cap one level at a time until the guardrail fails.
+    for depth in range(max(tree_depths(forest)) - 1, 0, -1):
+        capped = rebuild(forest, forest.roots, max_depth=depth)
+        if not passes(check(capped)):
+            break
+        forest = capped
+    record("cap_depth", forest, check(forest))
+
+    # 3. Merge identical subtrees (lossless).
+    forest = merge_subtrees(forest)
+    record("merge_subtrees", forest, check(forest))
+
+    # 4. Narrow dtypes, trying the most compact value encoding first.
+    for values in ("uint8", "float32", "float64"):
+        narrowed = shrink_dtypes(forest, values)
+        metrics = check(narrowed)
+        if passes(metrics):
+            forest = narrowed
+            record(f"dtypes_{values}", forest, metrics)
+            break
+    return forest, report
+
+
+def print_report(report):
+    print(f"{'stage':<16}{'trees':>6}{'nodes':>8}{'size':>12}{'predict':>12}{'accuracy':>10}{'top-3':>9}")
+    for r in report:
+        print(f"{r['stage']:<16}{r['trees']:>6}{r['nodes']:>8}{r['kib']:>8.0f} KiB{r['predict_ms']:>9.3f} ms"
+              f"{r['accuracy'] * 100:>9.2f}%{r['top3_agreement'] * 100:>8.2f}%")
+
+
+def evaluation_rows(features, X_test, y_test, X_train):
+    """Labelled test rows plus unlabelled training rows for top-3 agreement."""
+    X_eval = np.vstack([X_test[features].to_numpy(np.uint8), X_train[features].to_numpy(np.uint8)])
+    y_eval = np.concatenate([np.asarray(y_test, dtype=object), np.full(len(X_train), None, dtype=object)])
+    return X_eval, y_eval
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compress the model bundle's forest under an accuracy guardrail.")
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--output", help="defaults to overwriting --bundle")
+    parser.add_argument("--train", default="Training.csv", help="unique rows used for top-3 agreement")
+    parser.add_argument("--test", default="Testing.csv", help="labelled held-out rows")
+    parser.add_argument("--min-accuracy", type=float, default=0.97)
+    parser.add_argument("--min-top3-agreement", type=float, default=0.99)
+    args = parser.parse_args(argv)
+
+    bundle = load_bundle(args.bundle, mmap=False)
+    features = bundle["features"]
+    X_train, _, _ = load_unique(args.train)
+    X_test, y_test = load_frame(args.test)
+    X_eval, y_eval = evaluation_rows(features, X_test, y_test, X_train)
+
+    compressed, report = compress_forest(bundle["model"], X_eval, y_eval, args.min_accuracy, args.min_top3_agreement)
+    print_report(report)
+
+    bundle["model"] = compressed
+    bundle["metadata"] = {**bundle.get("metadata", {}), "compression": report[-1]}
+    output = args.output or args.bundle
+    save_bundle(bundle, output)
+    print(f"📦 Compressed bundle saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import numpy as np
+
+# --- Flattened Random Forest Inference ---
+# Compiles a fitted sklearn forest into contiguous node arrays and evaluates
+# every tree at once. All DiagnoX features are 0/1 flags, which allows two
+# simplifications over sklearn's generic traversal:
+#   * each split becomes a lookup table children[node, bit]: the child visited
+#     when the split feature is 0 or 1 (leaves point to themselves);
+#   * each root-to-leaf path becomes a column of `path_weights` holding +1 for
+#     features that must be 1 and -1 for features that must be 0. A row reaches
+#     a leaf exactly when  x @ path_weights[:, leaf] == path_length[leaf],
+#     so one row traverses every tree at once by summing the weight rows of
+#     its selected symptoms.
+# Batches instead walk every (row, tree) pair down one level per step with
+# array lookups. Their cost follows the path depth rather than the total
+# number of leaves, which a matrix product over path_weights would pay for
+# every row; predict_proba also scores repeated rows only once.
+# Probabilities are accumulated in tree order, exactly as sklearn does, so
+# results match RandomForestClassifier.predict_proba bit for bit. The arrays
+# may also use compact dtypes or share nodes between trees; see
+# forest_compression.py.
+
+
+class FlatForest:
+    """Array-based stand-in for a fitted RandomForestClassifier on binary inputs."""
+
+    value_scale = None
+
+    def __init__(self, feature, children, values, roots, classes, feature_names=None, value_scale=None):
+        self.feature = feature
+        self.children = children
+        self.values = values
+        # Set when `values` holds quantized integers: probability = value * scale.
+        self.value_scale = value_scale
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = None
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+            self.n_features_in_ = len(feature_names)
+        self._compile_paths()
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Builds a FlatForest from a fitted forest (or a single decision tree)."""
+        estimators = getattr(model, "estimators_", None)
+        if estimators is None:
+            if not hasattr(model, "tree_"):
+                raise TypeError(f"Cannot flatten a {type(model).__name__}; expected a fitted tree ensemble.")
+            estimators = [model]
+        n_classes = len(model.classes_)
+
+        features, children, values, roots = [], [], [], []
+        offset = 0
+        for est in estimators:
+            tree = est.tree_
+            is_leaf = tree.children_left == -1
+            ids = np.arange(tree.node_count)
+
+            # Child taken for x=0 and x=1 given the learned threshold (x <= t goes left).
+            thr = tree.threshold
+            left = np.where(is_leaf, ids, tree.children_left)
+            right = np.where(is_leaf, ids, tree.children_right)
+            child0 = np.where(0 <= thr, left, right)
+            child1 = np.where(1 <= thr, left, right)
+            children.append(np.stack([child0, child1], axis=1) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+
+            # Same normalization as DecisionTreeClassifier.predict_proba.
+            value = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.int32),
+            values=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            feature_names=getattr(model, "feature_names_in_", None),
+        )
+
+    def _compile_paths(self):
+        """Derives the leaf path matrix from the node arrays."""
+        n_features = self.n_features_in_ or int(self.feature.max()) + 1
+        is_leaf = self.is_leaf
+        leaf_nodes, columns = [], []
+        for root in self.roots:
+            stack = [(int(root), (), ())]
+            while stack:
+                node, ones, zeros = stack.pop()
+                f = int(self.feature[node])
+                if is_leaf[node]:
+                    leaf_nodes.append(node)
+                    columns.append((ones, zeros))
+                    continue
+                child0, child1 = self.children[node]
+                # Visit child0 first so leaves stay in left-to-right order.
+                stack.append((int(child1), ones + (f,), zeros))
+                stack.append((int(child0), ones, zeros + (f,)))
+
+        weights = np.zeros((n_features, len(leaf_nodes)), dtype=np.int8)
+        length = np.zeros(len(leaf_nodes), dtype=np.int16)
+        for col, (ones, zeros) in enumerate(columns):
+            weights[list(ones), col] = 1
+            weights[list(zeros), col] = -1
+            length[col] = len(set(ones))
+        self.leaf_nodes = np.asarray(leaf_nodes, dtype=np.int32)
+        self.path_weights = weights
+        self.path_length = length
+
+    def _walk_tables(self):
+        """Per-slot child slot, split feature and leaf flag for the batch walk.
+
+        A slot is 2 * node + bit, so one walk step is three flat lookups. The
+        tables are derived on first use and left out of pickled bundles.
+        """
+        tables = self.__dict__.get("_slot_tables")
+        if tables is None:
+            tables = (
+                2 * self.children.astype(np.intp).ravel(),
+                np.repeat(self.feature.astype(np.intp), 2),
+                np.repeat(self.is_leaf, 2),
+            )
+            self._slot_tables = tables
+        return tables
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_slot_tables", None)
+        return state
+
+    @property
+    def is_leaf(self):
+        """Leaves are the nodes whose children both point back to themselves."""
+        ids = np.arange(len(self.children))
+        return (self.children[:, 0] == ids) & (self.children[:, 1] == ids)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_features(self):
+        """Input width: one column per symptom, named or not."""
+        return self.path_weights.shape[0]
+
+    @property
+    def nbytes(self):
+        arrays = (self.feature, self.children, self.values, self.roots, self.leaf_nodes, self.path_weights, self.path_length)
+        return sum(a.nbytes for a in arrays)
+
+    def apply(self, X):
+        """Returns the leaf node reached in every tree, shape (n_rows, n_trees)."""
+        X = _as_binary(X, self.n_features)
+        if X.shape[0] == 1:
+            score = self.path_weights[np.flatnonzero(X[0])].sum(axis=0, dtype=np.int16)
+            return self.leaf_nodes[score == self.path_length][np.newaxis, :]
+        return self._walk(X)
+
+    def _walk(self, X, check_every=8):
+        """Walks all (row, tree) pairs level by level; returns leaves, shape (n_rows, n_trees).
+
+        Pairs are kept tree-major with X stored feature-major, so neighbouring
+        pairs mostly read the same nodes and symptom columns. Leaves step onto
+        themselves, so finished pairs are only dropped every `check_every` levels.
+        """
+        slot_child, slot_feature, slot_leaf = self._walk_tables()
+        n_rows = X.shape[0]
+        bits = np.ascontiguousarray(X.T).ravel()
+        feature_offset = slot_feature * n_rows
+        slots = np.repeat(2 * self.roots.astype(np.intp), n_rows)
+        rows = np.tile(np.arange(n_rows, dtype=np.intp), self.n_estimators)
+        pending = np.arange(len(slots))
+        leaves = np.empty(len(slots), dtype=np.intp)
+        while len(slots):
+            lookup, bit = np.empty_like(slots), np.empty(len(slots), dtype=np.uint8)
+            for _ in range(check_every):
+                # _as_binary checked the width, so indices are always in range and
+                # mode="clip" only skips numpy's checked copy.
+                np.take(feature_offset, slots, out=lookup, mode="clip")
+                lookup += rows
+                np.take(bits, lookup, out=bit, mode="clip")
+                slots += bit
+                np.take(slot_child, slots, out=lookup, mode="clip")
+                slots, lookup = lookup, slots
+            leaves[pending] = slots
+            internal = ~slot_leaf[slots]
+            pending, slots, rows = pending[internal], slots[internal], rows[internal]
+        return (leaves >> 1).reshape(self.n_estimators, n_rows).T
+
+    def predict_proba(self, X, chunk_rows=2048):
+        """Class probabilities averaged over trees, identical to sklearn's.
+
+        Repeated rows are scored once, since real batches repeat the same
+        symptom combinations many times.
+        """
+        X = _as_binary(X, self.n_features)
+        if X.shape[0] == 1:
+            return self._proba_from_leaves(self.apply(X))
+
+        packed = np.packbits(X, axis=1)
+        _, first, inverse = np.unique(packed, axis=0, return_index=True, return_inverse=True)
+        unique_rows = X[first]
+        proba = np.empty((len(unique_rows), len(self.classes_)))
+        for start in range(0, len(unique_rows), chunk_rows):
+            chunk = unique_rows[start:start + chunk_rows]
+            proba[start:start + len(chunk)] = self._proba_from_leaves(self.apply(chunk))
+        return proba[inverse.ravel()]
+
+    def _proba_from_leaves(self, leaves):
+        # Trees are added one after another, matching the accumulation order
+        # of RandomForestClassifier.predict_proba.
+        if leaves.shape[0] == 1:
+            proba = self.values[leaves[0]].sum(axis=0, dtype=np.float64)[np.newaxis, :]
+        else:
+            proba = np.zeros((leaves.shape[0], len(self.classes_)))
+            for tree_leaves in leaves.T:
+                proba += self.values[tree_leaves]
+        if self.value_scale is not None:
+            proba *= self.value_scale
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _as_binary(X, n_features=None):
+    """Coerces input to a 2-D uint8 0/1 matrix, `n_features` columns wide if given."""
+    X = np.atleast_2d((np.asarray(X) > 0).view(np.uint8))
+    if n_features is not None and (X.ndim != 2 or X.shape[1] != n_features):
+        raise ValueError(f"X has {X.shape[-1]} features, but the forest is expecting {n_features} features as input.")
+    return X
+
+
+def compile_model(model):
+    """Returns a FlatForest for supported tree models, otherwise the model unchanged."""
+    try:
+        return FlatForest.from_sklearn(model)
+    except TypeError:
+        return model
@@ -0,0 +1,378 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# --- Persistent Analysis History ---
+# A local SQLite log of structured analysis results, replacing the in-memory
+# list of strings each session used to keep. The database runs in WAL mode,
+# so readers never wait for the writer. All writes go through one background
+# thread fed by a bounded queue. The UI only enqueues and returns: a slow
+# disk never blocks a rerun, and a full queue drops (and counts) entries
+# rather than stalling. If a batch fails, its writes are retried one by one
+# so a single bad record loses only itself. A locked or unavailable database
+# fails every write alike, so the uncommitted part of the batch is retried
+# with backoff and only dropped after DEFAULT_WRITE_ATTEMPTS tries.
+#
+# Symptoms are stored as a little-endian bitset over the model's feature
+# order, with the order itself kept once in `feature_sets`. A `daily_counts`
+# rollup is updated in the same transaction as every insert/delete, so
+# per-day disease counts read a few hundred rows no matter how large the
+# log grows.
+
+DEFAULT_HISTORY_PATH = "diagnox_history.db"
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 0.05
+DEFAULT_WRITE_ATTEMPTS = 5
+DEFAULT_RETRY_SECONDS = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feature_sets (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    features TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    feature_set_id INTEGER NOT NULL REFERENCES feature_sets(id),
+    symptoms BLOB NOT NULL,
+    severity TEXT NOT NULL,
+    top_disease TEXT NOT NULL,
+    top_probability REAL NOT NULL,
+    predictions TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_session_time ON analyses(session_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_analyses_disease_time ON analyses(top_disease, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses(created_at, id);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    disease TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (day, disease)
+) WITHOUT ROWID;
+"""
+
+_INSERT_ANALYSIS = """
+INSERT INTO analyses (created_at, day, session_id, feature_set_id, symptoms, severity,
+                      top_disease, top_probability, predictions)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_DAILY = """
+INSERT INTO daily_counts (day, disease, n) VALUES (?, ?, ?)
+ON CONFLICT (day, disease) DO UPDATE SET n = n + excluded.n
+"""
+
+
+def encode_bitset(bits, n_features):
+    return int(bits).to_bytes(max(1, (n_features + 7) // 8), "little")
+
+
+def decode_symptoms(blob, features):
+    bits = int.from_bytes(blob, "little")
+    return [f for i, f in enumerate(features) if bits >> i & 1]
+
+
+def connect(path):
+    """Opens a connection with the pragmas every reader and writer uses."""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class HistoryStore:
+    """SQLite analysis log with a write-behind queue and indexed, paged reads."""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 write_attempts=DEFAULT_WRITE_ATTEMPTS, retry_seconds=DEFAULT_RETRY_SECONDS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.write_attempts = write_attempts
+        self.retry_seconds = retry_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with connect(path) as conn:
+            conn.executescript(SCHEMA)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}  # session_id -> records queued but not yet committed
+        self._pending_lock = threading.Lock()  # also guards the written/dropped counters
+        self._feature_sets = {}
+        self._local = threading.local()
+        self.written = 0
+        self.dropped = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="diagnox-history-writer", daemon=True)
+        self._thread.start()
+
+    # --- Writes (non-blocking) ---
+    def record(self, session_id, features, symptom_bits, severity, top_predictions, created_at=None):
+        """Queues one analysis for writing. Returns False if the queue was full."""
+        created_at = time.time() if created_at is None else created_at
+        record = {
+            "created_at": created_at,
+            "day": datetime.fromtimestamp(created_at).strftime("%Y-%m-%d"),
+            "session_id": session_id,
+            "features": features,
+            "symptoms": encode_bitset(symptom_bits, len(features)),
+            "severity": severity,
+            "top_disease": str(top_predictions[0]["disease"]),
+            "top_probability": float(top_predictions[0]["probability"]),
+            "predictions": json.dumps([{"disease": str(p["disease"]), "probability": float(p["probability"])}
+                                       for p in top_predictions]),
+        }
+        with self._pending_lock:
+            self._pending.setdefault(session_id, []).append(record)
+        if not self._offer(("insert", record)):
+            self._forget([record])
+            return False
+        return True
+
+    def clear_session(self, session_id):
+        """Queues deletion of one session's analyses."""
+        return self._offer(("clear", session_id))
+
+    def _offer(self, op):
+        try:
+            self._queue.put_nowait(op)
+            return True
+        except queue.Full:
+            self._count(dropped=1)
+            return False
+
+    def _count(self, written=0, dropped=0):
+        # Called from both the UI threads and the writer.
+        with self._pending_lock:
+            self.written += written
+            self.dropped += dropped
+
+    def flush(self, timeout=None):
+        """Waits until everything queued so far is committed (for tools and shutdown)."""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def _forget(self, records):
+        with self._pending_lock:
+            for record in records:
+                pending = self._pending.get(record["session_id"], [])
+                if record in pending:
+                    pending.remove(record)
+                if not pending:
+                    self._pending.pop(record["session_id"], None)
+
+    def _run(self):
+        conn, ops, attempt = None, [], 0
+        while True:
+            if ops:
+                # The database was locked or unavailable: back off, then retry.
+                time.sleep(self.retry_seconds * attempt)
+            else:
+                ops, attempt = self._next_batch(), 0
+            attempt += 1
+            retry = []
+            try:
+                conn, retry = self._process(conn, ops, last_attempt=attempt >= self.write_attempts)
+            except Exception as e:
+                # The writer must outlive any error: flush() callers wait on it.
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                retried = {id(op) for op in retry}
+                for op in ops:
+                    if op[0] == "flush" and id(op) not in retried:
+                        op[1].set()
+                ops = retry
+
+    def _process(self, conn, ops, last_attempt):
+        """Writes one batch and settles its bookkeeping.
+
+        Returns the connection to reuse and the ops to try again, which stay
+        pending until they commit or run out of attempts.
+        """
+        try:
+            if conn is None:
+                conn = connect(self.path)
+            committed, retry = self._write(conn, ops)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            committed, retry = 0, ops
+        if retry:
+            # Reconnect for the next attempt in case this connection is broken.
+            if conn is not None:
+                conn.close()
+            conn = None
+            if last_attempt:
+                retry = []
+        retried = {id(op[1]) for op in retry if op[0] == "insert"}
+        settled = [op[1] for op in ops if op[0] == "insert" and id(op[1]) not in retried]
+        self._count(written=committed, dropped=len(settled) - committed)
+        self._forget(settled)
+        return conn, retry
+
+    def _next_batch(self):
+        ops = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(ops) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                ops.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return ops
+
+    def _write(self, conn, ops):
+        """Commits `ops` in one transaction; returns (inserts committed, ops to retry).
+
+        If a record spoils the batch, the ops are retried one at a time so
+        only that record is lost. Locks and I/O errors would fail every op
+        alike, so the ops not committed yet are handed back to retry later.
+        """
+        try:
+            self._apply(conn, ops)
+            self.last_error = None
+            return sum(1 for kind, _ in ops if kind == "insert"), []
+        except sqlite3.OperationalError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return 0, ops
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+        committed = 0
+        for i, op in enumerate(ops):
+            try:
+                self._apply(conn, [op])
+            except sqlite3.OperationalError as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return committed, ops[i:]
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            else:
+                if op[0] == "insert":
+                    committed += 1
+        return committed, []
+
+    def _feature_set_id(self, conn, features, new_ids):
+        key = tuple(features)
+        if key in self._feature_sets:
+            return self._feature_sets[key]
+        if key not in new_ids:
+            blob = json.dumps(list(features))
+            digest = hashlib.sha1(blob.encode("utf-8")).hexdigest()
+            conn.execute("INSERT OR IGNORE INTO feature_sets (digest, features) VALUES (?, ?)", (digest, blob))
+            row = conn.execute("SELECT id FROM feature_sets WHERE digest = ?", (digest,)).fetchone()
+            new_ids[key] = row[0]
+        return new_ids[key]
+
+    def _apply(self, conn, ops):
+        # Ids of feature sets inserted by this transaction are only cached
+        # once it commits; a rollback would leave them pointing nowhere.
+        new_ids = {}
+        with conn:
+            for kind, payload in ops:
+                if kind == "insert":
+                    r = payload
+                    conn.execute(_INSERT_ANALYSIS, (
+                        r["created_at"], r["day"], r["session_id"], self._feature_set_id(conn, r["features"], new_ids),
+                        r["symptoms"], r["severity"], r["top_disease"], r["top_probability"], r["predictions"],
+                    ))
+                    conn.execute(_UPSERT_DAILY, (r["day"], r["top_disease"], 1))
+                elif kind == "clear":
+                    conn.execute(
+                        "UPDATE daily_counts SET n = n - (SELECT COUNT(*) FROM analyses a WHERE a.session_id = ? "
+                        "AND a.day = daily_counts.day AND a.top_disease = daily_counts.disease) "
+                        "WHERE (day, disease) IN (SELECT day, top_disease FROM analyses WHERE session_id = ?)",
+                        (payload, payload),
+                    )
+                    conn.execute("DELETE FROM daily_counts WHERE n <= 0")
+                    conn.execute("DELETE FROM analyses WHERE session_id = ?", (payload,))
+        self._feature_sets.update(new_ids)
+
+    # --- Reads (indexed, on a per-thread connection) ---
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def page(self, session_id=None, disease=None, before=None, limit=10):
+        """One page of analyses, newest first, using keyset paging.
+
+        `before` is the (created_at, id) cursor of the last row of the
+        previous page. Returns (rows, cursor for the next page or None).
+        """
+        clauses, params = [], []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if disease is not None:
+            clauses.append("top_disease = ?")
+            params.append(disease)
+        if before is not None:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._reader().execute(
+            f"SELECT id, created_at, session_id, severity, top_disease, top_probability, predictions "
+            f"FROM analyses {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        rows = [dict(r) for r in rows]
+        cursor = (rows[limit - 1]["created_at"], rows[limit - 1]["id"]) if len(rows) > limit else None
+        return rows[:limit], cursor
+
+    def pending(self, session_id, disease=None):
+        """Analyses queued for a session but not yet committed, newest first."""
+        with self._pending_lock:
+            records = list(self._pending.get(session_id, []))
+        return [r for r in reversed(records) if disease is None or r["top_disease"] == disease]
+
+    def diseases(self, session_id=None):
+        """Distinct top diseases, optionally for one session (for filters)."""
+        if session_id is None:
+            rows = self._reader().execute("SELECT DISTINCT disease FROM daily_counts ORDER BY disease")
+        else:
+            rows = self._reader().execute(
+                "SELECT DISTINCT top_disease FROM analyses WHERE session_id = ? ORDER BY top_disease", (session_id,))
+        return [r[0] for r in rows]
+
+    def symptoms_of(self, analysis_id):
+        """Decodes the stored symptom bitset of one analysis into names."""
+        row = self._reader().execute(
+            "SELECT a.symptoms, f.features FROM analyses a JOIN feature_sets f ON f.id = a.feature_set_id "
+            "WHERE a.id = ?", (analysis_id,)).fetchone()
+        return decode_symptoms(row["symptoms"], json.loads(row["features"])) if row else None
+
+    def daily_disease_counts(self, since_day=None, until_day=None):
+        """Analyses per (day, top disease) from the rollup table."""
+        clauses, params = [], []
+        if since_day is not None:
+            clauses.append("day >= ?")
+            params.append(since_day)
+        if until_day is not None:
+            clauses.append("day <= ?")
+            params.append(until_day)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return [dict(r) for r in self._reader().execute(
+            f"SELECT day, disease, n FROM daily_counts {where} ORDER BY day, n DESC", params)]
+
+    def stats(self):
+        with self._pending_lock:
+            written, dropped = self.written, self.dropped
+        return {
+            "queued": self._queue.qsize(),
+            "written": written,
+            "dropped": dropped,
+            "last_error": self.last_error,
+        }
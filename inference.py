@@ -0,0 +1,71 @@
+import warnings
+
+import numpy as np
+
+# --- Shared Inference Helpers ---
+# Used by both the Streamlit app and the offline tools so that every entry
+# point encodes symptoms, ranks diseases and looks up suggestions the same way.
+
+DEFAULT_SUGGESTION = "Consult a healthcare professional."
+
+
+def feature_order(model, symptoms_list=None):
+    """Returns the exact column order the model was fitted with."""
+    if hasattr(model, "feature_names_in_"):
+        return [str(f) for f in model.feature_names_in_]
+    return list(symptoms_list)
+
+
+def build_suggestions_index(medications_df):
+    """Indexes medications.csv by lower-cased disease name."""
+    index = {}
+    for disease, suggestion in zip(medications_df["Disease"], medications_df["Suggestion"]):
+        index.setdefault(str(disease).lower(), []).append(suggestion)
+    return index
+
+
+def suggestions_for(disease_name, suggestions_index):
+    """Looks up suggestions for a disease, falling back to the default advice."""
+    return suggestions_index.get(str(disease_name).lower(), [DEFAULT_SUGGESTION])
+
+
+def encode_symptom_lists(symptom_lists, features):
+    """Encodes an iterable of symptom-name lists into a 0/1 feature matrix."""
+    position = {name: i for i, name in enumerate(features)}
+    symptom_lists = list(symptom_lists)
+    X = np.zeros((len(symptom_lists), len(features)), dtype=np.uint8)
+    for row, symptoms in enumerate(symptom_lists):
+        cols = [position[s] for s in symptoms if s in position]
+        X[row, cols] = 1
+    return X
+
+
+def predict_proba(model, X):
+    """Runs predict_proba on a plain 0/1 array without the feature-name warning."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict_proba(X)
+
+
+def top_k_indices(proba, k=3):
+    """Returns the indices of the k most likely classes per row, best first."""
+    proba = np.atleast_2d(proba)
+    return np.argsort(proba, axis=1)[:, -k:][:, ::-1]
+
+
+def rank_predictions(proba, classes, suggestions_index, k=3):
+    """Turns one row of probabilities into the k best diseases with suggestions."""
+    return [
+        {
+            "disease": classes[i],
+            "probability": float(proba[i]),
+            "suggestions": suggestions_for(classes[i], suggestions_index),
+        }
+        for i in top_k_indices(proba, k)[0]
+    ]
+
+
+def top_predictions(model, features, symptoms, suggestions_index, k=3):
+    """Ranks the k most likely diseases for one symptom selection."""
+    proba = predict_proba(model, encode_symptom_lists([symptoms], features))[0]
+    return rank_predictions(proba, model.classes_, suggestions_index, k)
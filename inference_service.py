@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import os
+from http import HTTPStatus
+
+from inference import encode_symptom_lists, predict_proba, rank_predictions
+from metrics import REGISTRY, timed
+from model_bundle import DEFAULT_BUNDLE_PATH
+from model_store import ModelStore
+
+# --- Headless Inference Service ---
+# A small asyncio HTTP/1.1 server (standard library only) for integrations
+# that need predictions without the Streamlit UI. It serves the same bundle
+# as app2.py through a hot-reloading ModelStore, so feature order, disease
+# classes and medication suggestions match the app exactly.
+#
+#   POST /predict  {"symptoms": ["itching", "chills"], "k": 3}
+#   GET  /health   model version and batching settings
+#   GET  /metrics  stage histograms (with DIAGNOX_METRICS=1)
+#
+# Concurrent requests are coalesced: the first request in an empty queue
+# opens a window of --batch-window-ms, and everything that arrives before
+# it closes (up to --max-batch) is encoded into one matrix and scored with a
+# single vectorized predict_proba call. A window of 0 disables batching.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_SERVICE_PORT = 8765
+DEFAULT_BATCH_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 256
+MAX_BODY_BYTES = 1 << 20
+MAX_K = 10
+
+
+class RequestError(Exception):
+    """A client error reported back as an HTTP status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into batched predict_proba calls."""
+
+    def __init__(self, store, window_ms=DEFAULT_BATCH_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+        self.store = store
+        self.window = window_ms / 1e3
+        self.max_batch = max(1, int(max_batch))
+        self.batches = 0
+        self.rows = 0
+        self._queue = None
+        self._full = None
+        self._worker = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+
+    async def predict(self, symptoms, k=3):
+        """Queues one symptom list and waits for its ranked predictions."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((symptoms, k, future))
+        if self._queue.qsize() + 1 >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        if self.window <= 0:
+            return batch
+        # Wait out the window, or less once the queue holds a full batch,
+        # then take everything that arrived.
+        self._full.clear()
+        if self._queue.qsize() + 1 < self.max_batch:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Clients that disconnected while waiting have cancelled futures.
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            snapshot = self.store.current()
+            try:
+                # Scoring runs off the event loop so new requests keep queueing.
+                results = await loop.run_in_executor(None, self._score, snapshot, batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result((snapshot.version, result))
+
+    def _score(self, snapshot, batch):
+        with timed("service_encode"):
+            X = encode_symptom_lists((symptoms for symptoms, _, _ in batch), snapshot.features)
+        with timed("service_predict"):
+            proba = predict_proba(snapshot.model, X)
+        self.batches += 1
+        self.rows += len(batch)
+        classes = snapshot.model.classes_
+        with timed("service_suggestions"):
+            return [rank_predictions(row, classes, snapshot.suggestions, k) for row, (_, k, _) in zip(proba, batch)]
+
+
+class InferenceService:
+    """HTTP front end for a MicroBatcher."""
+
+    def __init__(self, store, batcher):
+        self.store = store
+        self.batcher = batcher
+
+    def parse_predict_request(self, body):
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be JSON.")
+        if not isinstance(payload, dict) or not isinstance(payload.get("symptoms"), list):
+            raise RequestError(HTTPStatus.BAD_REQUEST, 'Expected {"symptoms": [...]}.')
+        symptoms = payload["symptoms"]
+        if not symptoms:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Please provide at least one symptom.")
+        if not all(isinstance(s, str) for s in symptoms):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Symptoms must be a list of strings.")
+        known = set(self.store.current().features)
+        unknown = [s for s in symptoms if s not in known]
+        if unknown:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Unknown symptoms: {', '.join(map(str, unknown))}")
+        k = payload.get("k", 3)
+        if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= MAX_K:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"k must be an integer between 1 and {MAX_K}.")
+        return symptoms, k
+
+    async def handle(self, method, path, body):
+        """Routes one request; returns (status, content type, body bytes)."""
+        path = path.split("?")[0]
+        if path == "/predict":
+            if method != "POST":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST.")
+            symptoms, k = self.parse_predict_request(body)
+            version, predictions = await self.batcher.predict(symptoms, k)
+            return HTTPStatus.OK, "application/json", json.dumps(
+                {"model_version": version, "predictions": predictions}).encode("utf-8")
+        if path == "/health" and method == "GET":
+            snapshot = self.store.current()
+            return HTTPStatus.OK, "application/json", json.dumps({
+                "status": "ok",
+                "model_version": snapshot.version,
+                "last_reload_error": self.store.last_error,
+                "batch_window_ms": self.batcher.window * 1e3,
+                "max_batch": self.batcher.max_batch,
+                "batches": self.batcher.batches,
+                "rows": self.batcher.rows,
+            }).encode("utf-8")
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, "text/plain; version=0.0.4; charset=utf-8", REGISTRY.render_prometheus().encode("utf-8")
+        raise RequestError(HTTPStatus.NOT_FOUND, "Not found.")
+
+    async def serve_connection(self, reader, writer):
+        """Handles keep-alive HTTP/1.1 requests on one connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode("latin-1").split(maxsplit=2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "application/json",
+                                       b'{"error": "Request body too large."}', keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close" and version.strip() == "HTTP/1.1"
+
+                try:
+                    status, content_type, payload = await self.handle(method, path, body)
+                except RequestError as e:
+                    status, content_type = e.status, "application/json"
+                    payload = json.dumps({"error": str(e)}).encode("utf-8")
+                except Exception as e:
+                    status, content_type = HTTPStatus.INTERNAL_SERVER_ERROR, "application/json"
+                    payload = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+                await self.respond(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer, status, content_type, payload, keep_alive=True):
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+
+async def serve(bundle_path, host, port, window_ms, max_batch):
+    store = ModelStore(bundle_path)
+    store.start_watching()
+    batcher = MicroBatcher(store, window_ms, max_batch)
+    batcher.start()
+    service = InferenceService(store, batcher)
+    server = await asyncio.start_server(service.serve_connection, host, port, backlog=1024)
+    mode = f"{window_ms:g} ms batching window" if window_ms > 0 else "batching off"
+    print(f"🚀 DiagnoX inference service on http://{host}:{port} (model v{store.current().version}, {mode})", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+        store.stop_watching()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve DiagnoX predictions over HTTP with request micro-batching.")
+    parser.add_argument("--bundle", default=os.environ.get("DIAGNOX_BUNDLE_PATH", DEFAULT_BUNDLE_PATH))
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT)
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_BATCH_WINDOW_MS,
+                        help="how long to gather concurrent requests into one batch; 0 disables batching")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.bundle, args.host, args.port, args.batch_window_ms, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Stage Latency Metrics ---
+# In-process latency histograms per analysis stage (load, encode, predict,
+# suggestion lookup, PDF render, full rerun), exported in Prometheus text
+# format from a local endpoint. Turned on with DIAGNOX_METRICS=1; when off,
+# timed() hands back a shared no-op context manager so instrumented code
+# pays only for one attribute check.
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_PORT = 9464
+METRIC_NAME = "diagnox_stage_seconds"
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds), safe to update from any thread."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[slot] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        """Estimates a quantile by linear interpolation inside its bucket."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        rank, seen = q * total, 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Named stage histograms plus the switch that enables timing."""
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        hist = self._histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(stage, Histogram(self.buckets))
+        return hist
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    def timed(self, stage):
+        """Context manager timing a block into `stage`; a no-op when disabled."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        """Per-stage summary: count, mean and estimated p50/p95/p99 in milliseconds."""
+        summary = {}
+        for stage, hist in sorted(self._histograms.items()):
+            if hist.count:
+                summary[stage] = {
+                    "count": hist.count,
+                    "mean_ms": hist.sum / hist.count * 1e3,
+                    "p50_ms": hist.quantile(0.50) * 1e3,
+                    "p95_ms": hist.quantile(0.95) * 1e3,
+                    "p99_ms": hist.quantile(0.99) * 1e3,
+                }
+        return summary
+
+    def render_prometheus(self):
+        """All histograms in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each DiagnoX analysis stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for stage, hist in sorted(self._histograms.items()):
+            with hist._lock:
+                counts, total, seconds = list(hist.counts), hist.count, hist.sum
+            cumulative = 0
+            for bound, c in zip(hist.buckets, counts):
+                cumulative += c
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {seconds:.9f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get("DIAGNOX_METRICS", "0").lower() in ("1", "true", "yes"))
+
+
+def timed(stage):
+    """Times a block into the process-wide registry."""
+    return REGISTRY.timed(stage)
+
+
+def start_metrics_server(port=DEFAULT_PORT, host="127.0.0.1", registry=REGISTRY):
+    """Serves GET /metrics from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="diagnox-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from forest_engine import FlatForest
+
+# --- Model Bundle ---
+# One versioned artifact holding everything the app needs at startup: the
+# compiled forest, the exact feature order, the class list and a pre-indexed
+# disease -> suggestions table. It is written uncompressed with joblib so the
+# large node arrays can be memory-mapped instead of copied on load, and the
+# app no longer has to parse Training.csv or medications.csv to start.
+# Optionally it also carries per-class symptom rates from the training data
+# (used by symptom_recommender.py) and a similar-case index (case_index.py).
+
+BUNDLE_FORMAT_VERSION = 1
+DEFAULT_BUNDLE_PATH = os.path.join("models", "diagnox_bundle.joblib")
+DEFAULT_MODEL_PATH = os.path.join("models", "disease_predictor.pkl")
+
+
+class BundleError(ValueError):
+    """Raised when a bundle is malformed or inconsistent with its model."""
+
+
+def build_bundle(model, features, suggestions_index, metadata=None, symptom_rates=None, case_index=None):
+    """Assembles a bundle dict from a fitted forest or an existing FlatForest."""
+    flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+    bundle = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "features": [str(f) for f in features],
+        "classes": [str(c) for c in flat.classes_],
+        "suggestions": dict(suggestions_index),
+        "model": flat,
+        "metadata": dict(metadata or {}),
+    }
+    if symptom_rates is not None:
+        bundle["symptom_rates"] = np.asarray(symptom_rates, dtype=np.float32)
+    if case_index is not None:
+        bundle["case_index"] = case_index
+    validate_bundle(bundle)
+    return bundle
+
+
+def save_bundle(bundle, path=DEFAULT_BUNDLE_PATH):
+    """Writes a bundle atomically so a running app never sees a partial file."""
+    validate_bundle(bundle)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_bundle(path=DEFAULT_BUNDLE_PATH, mmap=True):
+    """Loads and validates a bundle, memory-mapping its arrays by default."""
+    bundle = joblib.load(path, mmap_mode="r" if mmap else None)
+    if not isinstance(bundle, dict) or "format_version" not in bundle:
+        raise BundleError(f"{path} is not a DiagnoX model bundle.")
+    validate_bundle(bundle)
+    return bundle
+
+
+def validate_bundle(bundle):
+    """Checks that the bundle's version, feature order and classes match its model."""
+    version = bundle.get("format_version")
+    if version != BUNDLE_FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format version {version}; expected {BUNDLE_FORMAT_VERSION}. Retrain with model_training.py.")
+
+    model = bundle["model"]
+    features = bundle["features"]
+    model_features = getattr(model, "feature_names_in_", None)
+    if model_features is not None and list(model_features) != features:
+        mismatch = next(
+            (i for i, (a, b) in enumerate(zip(features, model_features)) if a != b),
+            min(len(features), len(model_features)),
+        )
+        raise BundleError(
+            f"Bundle feature order does not match the model: {len(features)} bundle features vs "
+            f"{len(model_features)} model features, first difference at position {mismatch}."
+        )
+    if model.feature.max(initial=0) >= len(features):
+        raise BundleError(f"Model splits on feature {int(model.feature.max())} but the bundle lists only {len(features)} features.")
+    if not np.array_equal(np.asarray(model.classes_, dtype=str), np.asarray(bundle["classes"], dtype=str)):
+        raise BundleError("Bundle class list does not match the model's classes.")
+    rates = bundle.get("symptom_rates")
+    if rates is not None and rates.shape != (len(bundle["classes"]), len(features)):
+        raise BundleError(f"Bundle symptom rates have shape {rates.shape}; expected ({len(bundle['classes'])}, {len(features)}).")
+    cases = bundle.get("case_index")
+    if cases is not None and cases.features != features:
+        raise BundleError("Bundle case index was built with a different feature order.")
@@ -0,0 +1,109 @@
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+from attribution import PathAttributor
+from model_bundle import load_bundle
+from prediction_cache import file_signature
+
+# --- Shared, Hot-Reloadable Model ---
+# One read-only snapshot of the bundle per process, shared by every session.
+# A daemon thread polls the bundle file; when it changes, the new bundle is
+# loaded in the background and swapped in with a single reference assignment.
+# Analyses that already grabbed a snapshot keep using it until they finish,
+# so a reload never blocks or mixes models mid-request.
+
+DEFAULT_POLL_SECONDS = 2.0
+
+
+def build_attributor(model):
+    """Symptom attribution for tree models; None for models it cannot explain."""
+    try:
+        return PathAttributor.from_model(model)
+    except TypeError:
+        return None
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """Everything needed to analyze symptoms with one model version."""
+    version: int
+    model: object
+    features: list
+    symptoms_list: list
+    suggestions: dict
+    signature: tuple
+    symptom_rates: object = None
+    case_index: object = None
+    attributor: object = None
+    loaded_at: float = field(default_factory=time.time)
+
+
+class ModelStore:
+    """Holds the current ModelSnapshot and reloads it when the bundle changes."""
+
+    def __init__(self, path, poll_seconds=DEFAULT_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.last_error = None
+        self._version = 0
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._current = self._load()
+
+    def _load(self):
+        signature = file_signature(self.path)
+        bundle = load_bundle(self.path)
+        self._version += 1
+        return ModelSnapshot(
+            version=self._version,
+            model=bundle["model"],
+            features=list(bundle["features"]),
+            symptoms_list=sorted(bundle["features"]),
+            suggestions=bundle["suggestions"],
+            signature=signature,
+            symptom_rates=bundle.get("symptom_rates"),
+            case_index=bundle.get("case_index"),
+            attributor=build_attributor(bundle["model"]),
+        )
+
+    def current(self):
+        """Returns the active snapshot; callers should hold on to it for one analysis."""
+        return self._current
+
+    def reload_if_changed(self):
+        """Loads and swaps in the bundle if the file changed. Returns True on swap."""
+        with self._reload_lock:
+            signature = file_signature(self.path)
+            if signature is None or signature == self._current.signature:
+                return False
+            try:
+                snapshot = self._load()
+            except Exception as e:
+                # Keep serving the old model; a half-written or bad bundle is
+                # retried on the next poll once the file changes again.
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._current = replace(self._current, signature=signature)
+                return False
+            self.last_error = None
+            self._current = snapshot
+            return True
+
+    def start_watching(self):
+        """Starts the background polling thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="diagnox-model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.reload_if_changed()
+
@@ -1,48 +1,269 @@
 import pandas as pd
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import itertools
 import pickle
 import os
+import sys
+import time
+from case_index import CaseIndex
+from forest_compression import compress_forest, evaluation_rows, print_report
+from forest_engine import FlatForest
+from inference import build_suggestions_index
+from model_bundle import DEFAULT_BUNDLE_PATH, build_bundle, save_bundle
+from symptom_recommender import class_symptom_rates
+from training_data import load_frame, load_unique
 
-print("--- Starting Model Training ---")
-try:
-    train_df = pd.read_csv('Training.csv')
-    test_df = pd.read_csv('Testing.csv')
-    print("✅ Data loaded successfully!")
-except Exception as e:
-    print(f"❌ ERROR loading data: {e}")
-    exit()
-
-# Drop the 'Unnamed: 133' column if it exists in the training data
-if 'Unnamed: 133' in train_df.columns:
-    train_df = train_df.drop('Unnamed: 133', axis=1)
-    print("✅ Dropped 'Unnamed: 133' column from training data.")
-
-# Prepare the data
-X_train = train_df.drop('prognosis', axis=1)
-y_train = train_df['prognosis']
-X_test = test_df.drop('prognosis', axis=1)
-y_test = test_df['prognosis']
-
-print(f"Training model with {len(X_train.columns)} features.")
-
-# Train the model
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-rf_model.fit(X_train, y_train)
-print("✅ Model training complete!")
-
-# --- THIS IS THE MISSING LINE ---
-# Use the trained model to make predictions on the test data
-y_pred = rf_model.predict(X_test)
-
-# Now, evaluate the accuracy
-accuracy = accuracy_score(y_test, y_pred)
-print(f"✅ Model Accuracy: {accuracy * 100:.2f}%")
-
-# Save the final model
-if not os.path.exists('models'):
-    os.makedirs('models')
-with open('models/disease_predictor.pkl', 'wb') as file:
-    pickle.dump(rf_model, file)
-
-print("🚀 New, corrected model saved successfully to models/disease_predictor.pkl")
\ No newline at end of file
+# --- Training CLI ---
+# Loads the training data as weighted unique rows, runs a cross-validated
+# search over forest size, depth and max_features on a process pool, picks a
+# model by an accuracy-vs-latency budget and saves the pickle, the app bundle
+# and the search results table side by side. Each worker also fits its
+# candidate on all rows, and the chosen one is saved as is rather than refit. Training and test files may be
+# CSVs or bit-packed .dxb datasets (see packed_dataset.py).
+
+DEFAULT_N_ESTIMATORS = [25, 50, 100, 200]
+DEFAULT_MAX_DEPTH = [None, 20, 10]
+DEFAULT_MAX_FEATURES = ["sqrt", "log2"]
+RANDOM_STATE = 42
+
+# Data shared with worker processes, set once per worker by _init_worker.
+_worker_data = {}
+
+
+def parse_max_depth(value):
+    return None if value.lower() == "none" else int(value)
+
+
+def parse_max_features(value):
+    if value in ("sqrt", "log2"):
+        return value
+    return float(value) if "." in value else int(value)
+
+
+def candidate_grid(n_estimators, max_depths, max_features):
+    """Every combination of the searched hyperparameters."""
+    return [
+        {"n_estimators": n, "max_depth": d, "max_features": f}
+        for n, d, f in itertools.product(n_estimators, max_depths, max_features)
+    ]
+
+
+def _init_worker(X, y, weights, folds, features):
+    _worker_data.update(X=X, y=y, weights=weights, folds=folds, features=features)
+
+
+def evaluate_candidate(params):
+    """Cross-validates and refits one candidate; runs inside a worker process.
+
+    Returns the CV metrics and the pickled model fitted on all rows.
+    """
+    X, y, weights, folds, features = (_worker_data[k] for k in ("X", "y", "weights", "folds", "features"))
+    fold_accuracies, fit_times = [], []
+    for train_idx, val_idx in folds:
+        model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+        start = time.perf_counter()
+        model.fit(X[train_idx], y[train_idx], sample_weight=weights[train_idx])
+        fit_times.append(time.perf_counter() - start)
+        # Weighted by row counts, so this is accuracy over the original rows.
+        fold_accuracies.append(accuracy_score(y[val_idx], model.predict(X[val_idx]), sample_weight=weights[val_idx]))
+    # Fitted on named columns, exactly as the saved model must be.
+    final = fit_final(params, pd.DataFrame(X, columns=features), y, weights)
+    return {
+        **params,
+        "cv_accuracy": float(np.mean(fold_accuracies)),
+        "cv_accuracy_std": float(np.std(fold_accuracies)),
+        "fit_seconds": float(np.mean(fit_times)),
+    }, pickle.dumps(final)
+
+
+def fit_final(params, X, y, weights):
+    model = RandomForestClassifier(random_state=RANDOM_STATE, **params)
+    model.fit(X, y, sample_weight=weights)
+    return model
+
+
+def measure_latency_ms(model, row, repeats=200):
+    """Median single-row predict_proba latency of the compiled model the app uses."""
+    flat = FlatForest.from_sklearn(model)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        flat.predict_proba(row)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e3
+
+
+def select_candidate(results, models, accuracy_tolerance, max_latency_ms=None):
+    """Picks the fastest candidate within `accuracy_tolerance` of the best CV accuracy.
+
+    Candidates over `max_latency_ms` are excluded; if nothing fits the budget
+    the most accurate candidate is picked instead. Returns its results row
+    and its model fitted on all rows, unpickled from `models`.
+    """
+    best_accuracy = results["cv_accuracy"].max()
+    eligible = results[results["cv_accuracy"] >= best_accuracy - accuracy_tolerance]
+    if max_latency_ms is not None:
+        eligible = eligible[eligible["predict_ms"] <= max_latency_ms]
+    if eligible.empty:
+        print("⚠️ No candidate meets the latency budget; falling back to the most accurate model.")
+        eligible = results[results["cv_accuracy"] == best_accuracy]
+    chosen = eligible.sort_values(["predict_ms", "cv_accuracy", "size_kb"], ascending=[True, False, True]).iloc[0]
+    return chosen, pickle.loads(models[chosen.name])
+
+
+def run_search(grid, X, y, weights, folds, workers, X_test, y_test, features):
+    """Evaluates the grid on a process pool and measures each refitted candidate.
+
+    Returns the results table and the pickled refitted models, one per row.
+    """
+    rows, models = [], []
+    row = X_test.to_numpy(dtype=np.uint8)[:1]
+    initargs = (X, y, weights, folds, features)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        futures = [pool.submit(evaluate_candidate, params) for params in grid]
+        for done, future in enumerate(as_completed(futures), 1):
+            result, model_bytes = future.result()
+            params = {k: result[k] for k in ("n_estimators", "max_depth", "max_features")}
+            # Latency is measured here, one model at a time, so workers
+            # competing for cores do not skew it.
+            model = pickle.loads(model_bytes)
+            result["predict_ms"] = measure_latency_ms(model, row)
+            result["size_kb"] = len(model_bytes) / 1024
+            result["test_accuracy"] = accuracy_score(y_test, model.predict(X_test))
+            rows.append(result)
+            models.append(model_bytes)
+            print(f"  [{done}/{len(grid)}] {params} cv={result['cv_accuracy'] * 100:.2f}% "
+                  f"predict={result['predict_ms']:.3f}ms size={result['size_kb']:.0f}KiB")
+    return pd.DataFrame(rows), models
+
+
+def save_artifacts(model, features, models_dir, bundle_path, metadata, bundle_model=None, symptom_rates=None,
+                   case_index=None):
+    """Writes the app bundle (optionally with a compressed forest) and the pickled model.
+
+    Both are written to temporary files before either is swapped in, bundle
+    first: a crash can no longer leave a new pickle next to the old bundle
+    the app keeps serving.
+    """
+    os.makedirs(models_dir, exist_ok=True)
+    model_path = os.path.join(models_dir, "disease_predictor.pkl")
+    tmp_model_path = f"{model_path}.tmp"
+    with open(tmp_model_path, "wb") as file:
+        pickle.dump(model, file)
+    try:
+        medications_df = pd.read_csv("medications.csv")
+        bundle = build_bundle(bundle_model or model, features, build_suggestions_index(medications_df),
+                              metadata=metadata, symptom_rates=symptom_rates, case_index=case_index)
+        save_bundle(bundle, bundle_path)
+    except BaseException:
+        os.remove(tmp_model_path)
+        raise
+    print(f"📦 App bundle saved to {bundle_path}")
+    os.replace(tmp_model_path, model_path)
+    print(f"🚀 Model saved to {model_path} ({os.path.getsize(model_path) / 1024:.0f} KiB)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Train the DiagnoX disease predictor.")
+    parser.add_argument("--train", default=os.environ.get("DIAGNOX_TRAIN_PATH", "Training.csv"))
+    parser.add_argument("--test", default=os.environ.get("DIAGNOX_TEST_PATH", "Testing.csv"))
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=DEFAULT_N_ESTIMATORS)
+    parser.add_argument("--max-depth", type=parse_max_depth, nargs="+", default=DEFAULT_MAX_DEPTH,
+                        help="tree depths to try; 'none' for unlimited")
+    parser.add_argument("--max-features", type=parse_max_features, nargs="+", default=DEFAULT_MAX_FEATURES)
+    parser.add_argument("--cv", type=int, default=5, help="cross-validation folds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes for the search")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.005,
+                        help="accept candidates this far below the best CV accuracy (0.005 = 0.5 points)")
+    parser.add_argument("--max-latency-ms", type=float, help="reject candidates slower than this per row")
+    parser.add_argument("--compress", action="store_true",
+                        help="compress the bundled forest (see forest_compression.py)")
+    parser.add_argument("--min-accuracy", type=float, default=0.97, help="compression guardrail")
+    parser.add_argument("--min-top3-agreement", type=float, default=0.99, help="compression guardrail")
+    parser.add_argument("--no-search", action="store_true",
+                        help="skip the search and train a single 100-tree forest")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    print("--- Starting Model Training ---")
+    try:
+        X_unique, y_unique, sample_weight = load_unique(args.train)
+        X_test, y_test = load_frame(args.test)
+        print("✅ Data loaded successfully!")
+    except Exception as e:
+        print(f"❌ ERROR loading data: {e}")
+        return 1
+
+    features = X_unique.columns.tolist()
+    X = X_unique.to_numpy(dtype=np.uint8)
+    y = y_unique.to_numpy()
+    X_test_frame = X_test[features]
+    y_test = y_test.to_numpy()
+    n_train_rows = int(sample_weight.sum())
+    print(f"✅ Deduplicated {n_train_rows} rows into {len(X)} unique vectors ({n_train_rows / len(X):.1f}x smaller).")
+    print(f"Training model with {len(features)} features.")
+
+    if args.no_search:
+        grid = candidate_grid([100], [None], ["sqrt"])
+    else:
+        grid = candidate_grid(args.n_estimators, args.max_depth, args.max_features)
+    # Stratify on the unique rows; every class needs at least `cv` of them.
+    n_folds = max(2, min(args.cv, int(pd.Series(y).value_counts().min())))
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+
+    print(f"🔎 Evaluating {len(grid)} candidates with {n_folds}-fold CV on {args.workers} workers...")
+    start = time.perf_counter()
+    results, models = run_search(grid, X, y, sample_weight, folds, args.workers, X_test_frame, y_test, features)
+    print(f"✅ Search complete in {time.perf_counter() - start:.1f}s!")
+
+    chosen, rf_model = select_candidate(results, models, args.accuracy_tolerance, args.max_latency_ms)
+    del models
+    params = {k: chosen[k] for k in ("n_estimators", "max_depth", "max_features")}
+    params["n_estimators"] = int(params["n_estimators"])
+    params["max_depth"] = None if pd.isna(params["max_depth"]) else int(params["max_depth"])
+    results["selected"] = results.index == chosen.name
+
+    os.makedirs(args.models_dir, exist_ok=True)
+    results_path = os.path.join(args.models_dir, "search_results.csv")
+    results.sort_values(["cv_accuracy", "predict_ms"], ascending=[False, True]).to_csv(results_path, index=False)
+    print(f"📊 Search results written to {results_path}")
+
+    accuracy = accuracy_score(y_test, rf_model.predict(X_test_frame))
+    print(f"✅ Selected {params}: CV {chosen['cv_accuracy'] * 100:.2f}%, "
+          f"{chosen['predict_ms']:.3f} ms/row, test accuracy {accuracy * 100:.2f}%")
+
+    metadata = {
+        "test_accuracy": accuracy,
+        "cv_accuracy": float(chosen["cv_accuracy"]),
+        "params": params,
+        "training_rows": n_train_rows,
+        "unique_rows": len(X),
+    }
+    bundle_model = None
+    if args.compress:
+        print("🗜️ Compressing forest...")
+        X_eval, y_eval = evaluation_rows(features, X_test_frame, y_test, X_unique)
+        bundle_model, report = compress_forest(FlatForest.from_sklearn(rf_model), X_eval, y_eval,
+                                               args.min_accuracy, args.min_top3_agreement)
+        print_report(report)
+        metadata["compression"] = report[-1]
+
+    rates = class_symptom_rates(X, y, rf_model.classes_, sample_weight)
+    cases = CaseIndex.from_matrix(X, y, features, sample_weight)
+    print(f"🗂️ Indexed {len(cases)} unique cases for similar-case lookup ({cases.nbytes / 1024:.0f} KiB)")
+    save_artifacts(rf_model, features, args.models_dir, args.bundle, metadata, bundle_model, rates, cases)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
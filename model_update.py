@@ -0,0 +1,277 @@
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+
+from case_index import CaseIndex
+from model_bundle import DEFAULT_BUNDLE_PATH, load_bundle
+from model_training import RANDOM_STATE, fit_final, save_artifacts
+from packed_dataset import NO_LABEL, PackedStore
+from symptom_recommender import rates_from_counts
+from training_data import deduplicate, load_frame
+
+# --- Incremental Model Updates ---
+# Folds newly confirmed cases into the published model without refitting
+# the whole forest:
+#   1. stage the cases as a new segment of the packed training store
+#      (models/training_store/, a PackedStore seeded from Training.csv on
+#      first use);
+#   2. check drift: accuracy of the current model on the new cases, new
+#      diagnoses it has never seen, and how far the label mix moved;
+#   3. either warm-start: fit --new-trees trees on the new cases plus a
+#      stratified replay sample read straight from the store's memory maps
+#      and retire as many of the oldest trees, or retrain fully on the
+#      deduplicated store when the drift check asks for it;
+#   4. refuse to publish if holdout accuracy drops more than allowed, and
+#      discard the staged cases; else write the pickle and a new bundle
+#      version (which running apps pick up through ModelStore's hot
+#      reload) and only then commit the cases to the store.
+# A warm start reads the store's 2-byte label codes and the replayed rows,
+# takes symptom rates from per-segment counts and extends the previous case
+# index, so apart from those label codes and the case index merge its cost
+# depends on the batch and replay sizes, not on the size of the store.
+# A full retrain also compacts the store's segments into one.
+
+DEFAULT_STORE_PATH = os.path.join("models", "training_store")
+DEFAULT_NEW_TREES = 10
+DEFAULT_REPLAY_ROWS = 5000
+DEFAULT_RECENT_WEIGHT = 2.0
+
+
+def stratified_replay(label_codes, n_rows, rng):
+    """Up to `n_rows` labelled row indices, split evenly over the labels.
+
+    Rows are drawn uniformly within each label, so a case seen many times is
+    replayed in proportion to its count, as weighted unique rows would be.
+    """
+    labelled = np.flatnonzero(label_codes != NO_LABEL)
+    if len(labelled) <= n_rows:
+        return labelled
+    order = labelled[np.argsort(label_codes[labelled], kind="stable")]
+    _, starts = np.unique(label_codes[order], return_index=True)
+    bounds = np.append(starts, len(order))
+    per_class = max(1, n_rows // len(starts))
+    return np.concatenate([rng.choice(order[lo:hi], size=min(hi - lo, per_class), replace=False)
+                           for lo, hi in zip(bounds[:-1], bounds[1:])])
+
+
+def sample_replay(store, n_rows, rng):
+    """A stratified replay sample of the store as weighted unique rows (X, y, weights)."""
+    X, y = store.take(stratified_replay(store.label_codes(), n_rows, rng))
+    return deduplicate(X, y)
+
+
+def drift_report(model, X_new, y_new, store_counts):
+    """Drift metrics of the current model against a batch of confirmed cases.
+
+    `store_counts` holds the store's rows per label (a Series indexed by label).
+    """
+    known = set(model.classes_)
+    new_labels = sorted(set(y_new) - known)
+    seen = np.isin(y_new, model.classes_)
+    accuracy = float("nan")
+    if seen.any():
+        predicted = model.predict(pd.DataFrame(X_new[seen], columns=model.feature_names_in_))
+        accuracy = accuracy_score(y_new[seen], predicted)
+    # Jensen-Shannon divergence (bits) between the batch and store label mixes.
+    labels = sorted(set(store_counts.index) | set(y_new))
+    p = pd.Series(y_new).value_counts(normalize=True).reindex(labels, fill_value=0).to_numpy()
+    q = store_counts.groupby(level=0).sum().reindex(labels, fill_value=0).to_numpy(dtype=np.float64)
+    q = q / max(q.sum(), 1e-12)
+    m = (p + q) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        js = 0.5 * np.nansum(np.where(p > 0, p * np.log2(p / m), 0)) + 0.5 * np.nansum(np.where(q > 0, q * np.log2(q / m), 0))
+    return {"new_case_accuracy": float(accuracy), "new_labels": new_labels, "label_js_divergence": float(js)}
+
+
+def choose_mode(report, min_accuracy, max_js):
+    """'full' when the model cannot absorb the batch by growing trees, else 'incremental'."""
+    if report["new_labels"]:
+        return "full", f"new diagnoses {report['new_labels']}"
+    if report["new_case_accuracy"] < min_accuracy:
+        return "full", f"accuracy on new cases {report['new_case_accuracy'] * 100:.1f}% < {min_accuracy * 100:.1f}%"
+    if report["label_js_divergence"] > max_js:
+        return "full", f"label mix shifted (JS {report['label_js_divergence']:.3f} > {max_js})"
+    return "incremental", "drift within limits"
+
+
+def warm_start_update(model, X_new, y_new, w_new, X_replay, y_replay, w_replay,
+                      new_trees=DEFAULT_NEW_TREES, recent_weight=DEFAULT_RECENT_WEIGHT, retire=True):
+    """Grows `model` by `new_trees` trees fitted on recent + replayed rows, retiring the oldest.
+
+    The fit data must hold exactly the model's classes, otherwise the new
+    trees' class columns would not line up with the old ones; the stratified
+    replay guarantees that for classes still present in the store.
+    """
+    X_fit = np.concatenate([X_new, X_replay])
+    y_fit = np.concatenate([y_new, y_replay])
+    w_fit = np.concatenate([w_new * recent_weight, w_replay])
+    missing = set(model.classes_) - set(y_fit)
+    if missing:
+        raise ValueError(f"Warm start needs every class in the fit data; missing {sorted(missing)}.")
+    unseen = set(y_fit) - set(model.classes_)
+    if unseen:
+        raise ValueError(f"Warm start cannot add classes {sorted(unseen)}; retrain fully instead.")
+
+    n_before = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=n_before + new_trees)
+    # Same column names as the original fit keeps sklearn's feature checks happy.
+    model.fit(pd.DataFrame(X_fit, columns=model.feature_names_in_), y_fit, sample_weight=w_fit)
+    if retire:
+        model.estimators_ = model.estimators_[new_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    return model
+
+
+def full_retrain(model, X_store, y_store, w_store, features):
+    params = {k: model.get_params()[k] for k in ("n_estimators", "max_depth", "max_features")}
+    return fit_final(params, pd.DataFrame(X_store, columns=features), y_store, w_store)
+
+
+def holdout_accuracy(model, features, X_holdout, y_holdout):
+    return accuracy_score(y_holdout, model.predict(pd.DataFrame(X_holdout, columns=features)))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fold newly confirmed cases into the published model.")
+    parser.add_argument("cases", nargs="?",
+                        help="CSV or .dxb of confirmed cases laid out like Training.csv; "
+                             "omit to refit from the store as it is")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="packed training store directory to add to")
+    parser.add_argument("--base", default=os.environ.get("DIAGNOX_TRAIN_PATH", "Training.csv"),
+                        help="data that seeds the store on first use")
+    parser.add_argument("--holdout", default=os.environ.get("DIAGNOX_TEST_PATH", "Testing.csv"))
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--mode", choices=["auto", "incremental", "full"], default="auto")
+    parser.add_argument("--new-trees", type=int, default=DEFAULT_NEW_TREES)
+    parser.add_argument("--keep-old-trees", action="store_true", help="grow the forest without retiring trees")
+    parser.add_argument("--replay-rows", type=int, default=DEFAULT_REPLAY_ROWS)
+    parser.add_argument("--recent-weight", type=float, default=DEFAULT_RECENT_WEIGHT)
+    parser.add_argument("--drift-min-accuracy", type=float, default=0.9,
+                        help="retrain fully when the current model is less accurate than this on the new cases")
+    parser.add_argument("--drift-max-js", type=float, default=0.5,
+                        help="retrain fully when the label mix diverges more than this (JS, bits)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="do not publish if holdout accuracy falls more than this")
+    return parser
+
+
+def load_cases(path, features):
+    """Confirmed cases as (0/1 matrix in `features` order, labels); empty without a path."""
+    if not path:
+        return np.zeros((0, len(features)), dtype=np.uint8), np.array([], dtype=object)
+    X, y = load_frame(path)
+    missing = [f for f in features if f not in X.columns]
+    if missing:
+        raise ValueError(f"cases lack {len(missing)} model features, e.g. {missing[:3]}")
+    return X[features].to_numpy(dtype=np.uint8), y.to_numpy().astype(object)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    model_path = os.path.join(args.models_dir, "disease_predictor.pkl")
+
+    print("--- Starting Model Update ---")
+    try:
+        with open(model_path, "rb") as file:
+            model = pickle.load(file)
+        previous = load_bundle(args.bundle, mmap=False)
+        features = [str(f) for f in model.feature_names_in_]
+        X_cases, y_cases = load_cases(args.cases, features)
+        X_holdout, y_holdout = load_cases(args.holdout, features)
+    except Exception as e:
+        print(f"❌ ERROR loading model or data: {e}")
+        return 1
+
+    start = time.perf_counter()
+    store = PackedStore(args.store)
+    if not len(store):
+        X_base, y_base = load_cases(args.base, features)
+        store.append(X_base, y_base, features)
+        print(f"🗄️ Seeded training store {args.store} from {args.base}")
+    # The published case index can be extended only if it covers exactly the store.
+    case_index = previous.get("case_index")
+    if case_index is not None and case_index.multiplicity.sum() != len(store):
+        case_index = None
+    if len(X_cases):
+        store.stage(X_cases, y_cases, features)
+    print(f"✅ Staged {len(X_cases)} cases; store will hold {len(store)} rows in {len(store.segments)} segments")
+
+    if len(X_cases):
+        report = drift_report(model, X_cases, y_cases, store.label_counts())
+        mode, reason = (args.mode, "requested") if args.mode != "auto" else choose_mode(
+            report, args.drift_min_accuracy, args.drift_max_js)
+        if mode == "incremental" and report["new_labels"]:
+            print(f"⚠️ New diagnoses {report['new_labels']} need a full retrain; switching modes.")
+            mode, reason = "full", "new diagnoses"
+        print(f"📉 Drift: {report['new_case_accuracy'] * 100:.1f}% accuracy on new cases, "
+              f"label JS divergence {report['label_js_divergence']:.3f} -> {mode} update ({reason})")
+    else:
+        report, mode, reason = None, "full", "refit from store"
+        print("📉 No new cases given -> full refit from the store")
+
+    accuracy_before = holdout_accuracy(model, features, X_holdout, y_holdout)
+    fit_start = time.perf_counter()
+    X_unique = y_unique = w_unique = None
+    if mode == "incremental":
+        X_new, y_new, w_new = deduplicate(X_cases, y_cases)
+        rng = np.random.default_rng(RANDOM_STATE + len(model.estimators_))
+        X_replay, y_replay, w_replay = sample_replay(store, args.replay_rows, rng)
+        updated = warm_start_update(model, X_new, y_new, w_new, X_replay, y_replay, w_replay,
+                                    args.new_trees, args.recent_weight, retire=not args.keep_old_trees)
+    else:
+        X_unique, y_unique, w_unique = store.unique_rows()
+        updated = full_retrain(model, X_unique, y_unique, w_unique, features)
+    fit_seconds = time.perf_counter() - fit_start
+    accuracy_after = holdout_accuracy(updated, features, X_holdout, y_holdout)
+    print(f"✅ {mode.title()} fit in {fit_seconds:.2f}s: holdout accuracy "
+          f"{accuracy_before * 100:.2f}% -> {accuracy_after * 100:.2f}% ({len(updated.estimators_)} trees)")
+
+    if accuracy_after < accuracy_before - args.max_accuracy_drop:
+        store.discard()
+        kept = "The cases were not added to the store; review them and rerun." if len(X_cases) else "The store is unchanged."
+        print(f"❌ Not publishing: holdout accuracy fell more than {args.max_accuracy_drop * 100:.1f} points. {kept}")
+        return 2
+
+    if X_unique is None and case_index is not None:
+        cases = case_index.extend(X_cases, y_cases)
+    else:
+        if X_unique is None:
+            X_unique, y_unique, w_unique = store.unique_rows()
+        cases = CaseIndex.from_matrix(X_unique, y_unique, features, w_unique)
+    metadata = dict(previous.get("metadata", {}))
+    metadata.pop("compression", None)
+    metadata.update({
+        "model_version": int(metadata.get("model_version", 1)) + 1,
+        "test_accuracy": accuracy_after,
+        "training_rows": len(store),
+        "unique_rows": len(cases),
+        "last_update": {
+            "mode": mode,
+            "reason": reason,
+            "new_cases": len(X_cases),
+            "fit_seconds": fit_seconds,
+            "drift": report,
+        },
+    })
+    rates = rates_from_counts(*store.symptom_counts(updated.classes_))
+    try:
+        save_artifacts(updated, features, args.models_dir, args.bundle, metadata, symptom_rates=rates, case_index=cases)
+    except Exception:
+        store.discard()
+        raise
+    store.commit()
+    if mode == "full":
+        store.compact()
+    print(f"🚀 Published model version {metadata['model_version']} in {time.perf_counter() - start:.1f}s total")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+# --- Bit-Packed Symptom Dataset ---
+# Stores symptom matrices as one bit per flag (132 flags -> 17 bytes per row)
+# instead of CSV text parsed into int64 columns (8 bytes per flag). Layout:
+#
+#   magic "DXPK" | version u16 | reserved u16
+#   packed rows  : n_rows x row_bytes uint8 (np.packbits, big-endian bit order)
+#   label codes  : n_rows uint16, indexes into schema["labels"] (0xFFFF = none)
+#   schema       : UTF-8 JSON {features, labels, n_rows, row_bytes, ...}
+#   schema size  : u64, followed by the magic again
+#
+# The schema sits at the end so the converter can stream rows of unknown count
+# straight to disk. The loader memory-maps the rows and labels and only
+# unpacks the chunks it is asked for.
+#
+# A PackedStore is a directory of such files ("segments") that only grows by
+# adding segments, so appending costs the same however large it gets.
+# Segments written by write_rows also record per-label row and symptom
+# counts in their schema, so store-wide rates never reread the rows.
+
+MAGIC = b"DXPK"
+FORMAT_VERSION = 1
+PREFIX = struct.Struct("<4sHH")
+TRAILER = struct.Struct("<Q4s")
+NO_LABEL = 0xFFFF
+PACKED_SUFFIX = ".dxb"
+SEGMENT_PREFIX = "segment-"
+STAGED_SUFFIX = ".staged"
+
+
+def unique_row_keys(keys):
+    """Groups identical byte rows of a 2-D uint8 array with a hash table.
+
+    Returns the index of each group's first row (in original order) and the
+    group sizes. Much faster than np.unique(axis=0), which sorts row-wise.
+    """
+    keys = np.ascontiguousarray(keys, dtype=np.uint8)
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    rows = keys.view(np.dtype((np.void, keys.shape[1]))).ravel()
+    codes, _ = pd.factorize(rows)
+    _, first = np.unique(codes, return_index=True)
+    return first, np.bincount(codes)
+
+
+def is_packed_path(path):
+    return isinstance(path, (str, os.PathLike)) and os.fspath(path).endswith(PACKED_SUFFIX)
+
+
+def convert_csv(csv_path, out_path, chunksize=100000, label_column="prognosis", drop_columns=("Unnamed: 133",)):
+    """Streams a symptom CSV into the bit-packed format. Returns the row count."""
+    features = None
+    labels, label_codes = {}, []
+    n_rows = 0
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(PREFIX.pack(MAGIC, FORMAT_VERSION, 0))
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk = chunk.drop(columns=list(drop_columns), errors="ignore")
+            if features is None:
+                features = [c for c in chunk.columns if c != label_column]
+            X = (chunk[features].to_numpy() > 0).astype(np.uint8)
+            out.write(np.packbits(X, axis=1).tobytes())
+
+            if label_column in chunk.columns:
+                chunk_codes, uniques = pd.factorize(chunk[label_column])
+                mapping = np.array([labels.setdefault(u, len(labels)) for u in uniques] + [NO_LABEL], dtype=np.uint16)
+                codes = mapping[chunk_codes]  # factorize marks missing labels as -1
+            else:
+                codes = np.full(len(chunk), NO_LABEL, dtype=np.uint16)
+            label_codes.append(codes)
+            n_rows += len(chunk)
+
+        if len(labels) >= NO_LABEL:
+            raise ValueError(f"Too many distinct labels ({len(labels)}) for uint16 codes.")
+        out.write(np.concatenate(label_codes).astype("<u2").tobytes() if label_codes else b"")
+        schema = {
+            "features": features or [],
+            "labels": list(labels),
+            "label_column": label_column,
+            "n_rows": n_rows,
+            "row_bytes": (len(features or []) + 7) // 8,
+            "source": os.path.basename(os.fspath(csv_path)),
+        }
+        blob = json.dumps(schema).encode("utf-8")
+        out.write(blob)
+        out.write(TRAILER.pack(len(blob), MAGIC))
+    os.replace(tmp_path, out_path)
+    return n_rows
+
+
+def write_rows(path, X, labels, features, label_column="prognosis", source=None):
+    """Writes 0/1 rows and their labels (None = unlabelled) to a new packed file.
+
+    The file is written under a temporary name and renamed into place.
+    Returns the row count.
+    """
+    X = (np.asarray(X) > 0).astype(np.uint8)
+    codes, vocabulary = pd.factorize(np.asarray(labels, dtype=object))
+    if len(vocabulary) >= NO_LABEL:
+        raise ValueError(f"Too many distinct labels ({len(vocabulary)}) for uint16 codes.")
+    schema = {
+        "features": [str(f) for f in features],
+        "labels": [str(v) for v in vocabulary],
+        "label_column": label_column,
+        "n_rows": len(X),
+        "row_bytes": (X.shape[1] + 7) // 8,
+        "source": source,
+        "label_counts": np.bincount(codes[codes >= 0], minlength=len(vocabulary)).tolist(),
+        "symptom_counts": [X[codes == c].sum(axis=0, dtype=np.int64).tolist() for c in range(len(vocabulary))],
+    }
+    _write_packed(path, np.packbits(X, axis=1), np.where(codes >= 0, codes, NO_LABEL).astype("<u2"), schema)
+    return len(X)
+
+
+def _write_packed(path, packed, codes, schema):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(PREFIX.pack(MAGIC, FORMAT_VERSION, 0))
+        out.write(np.ascontiguousarray(packed, dtype=np.uint8).tobytes())
+        out.write(np.asarray(codes, dtype="<u2").tobytes())
+        blob = json.dumps(schema).encode("utf-8")
+        out.write(blob)
+        out.write(TRAILER.pack(len(blob), MAGIC))
+    os.replace(tmp_path, path)
+
+
+class PackedDataset:
+    """Memory-mapped reader for the bit-packed format."""
+
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            magic, version, _ = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a packed DiagnoX dataset.")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported packed dataset version {version}; expected {FORMAT_VERSION}.")
+            f.seek(size - TRAILER.size)
+            schema_len, end_magic = TRAILER.unpack(f.read(TRAILER.size))
+            if end_magic != MAGIC:
+                raise ValueError(f"{path} is truncated or corrupt.")
+            f.seek(size - TRAILER.size - schema_len)
+            self.schema = json.loads(f.read(schema_len).decode("utf-8"))
+
+        self.features = self.schema["features"]
+        self.classes = np.asarray(self.schema["labels"], dtype=object)
+        self.n_rows = self.schema["n_rows"]
+        self.row_bytes = self.schema["row_bytes"]
+        rows_offset = PREFIX.size
+        labels_offset = rows_offset + self.n_rows * self.row_bytes
+        if self.n_rows:
+            self.packed = np.memmap(path, dtype=np.uint8, mode="r", offset=rows_offset, shape=(self.n_rows, self.row_bytes))
+            self.label_codes = np.memmap(path, dtype="<u2", mode="r", offset=labels_offset, shape=(self.n_rows,))
+        else:
+            self.packed = np.zeros((0, self.row_bytes), dtype=np.uint8)
+            self.label_codes = np.zeros(0, dtype="<u2")
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def has_labels(self):
+        return len(self.classes) > 0
+
+    def unpack(self, start=0, stop=None):
+        """Returns rows [start, stop) as a 0/1 uint8 matrix."""
+        return np.unpackbits(self.packed[start:stop], axis=1, count=len(self.features))
+
+    def labels(self, start=0, stop=None):
+        """Returns the label strings for rows [start, stop) (None where unlabelled)."""
+        return self._decode(np.asarray(self.label_codes[start:stop]))
+
+    def _decode(self, codes):
+        out = np.full(len(codes), None, dtype=object)
+        known = codes != NO_LABEL
+        out[known] = self.classes[codes[known]]
+        return out
+
+    def iter_chunks(self, chunksize=100000):
+        """Yields (X, y) chunks, unpacking only one chunk at a time."""
+        for start in range(0, self.n_rows, chunksize):
+            stop = min(start + chunksize, self.n_rows)
+            yield self.unpack(start, stop), self.labels(start, stop)
+
+    def iter_frames(self, chunksize=100000):
+        """Yields chunks as DataFrames laid out like the source CSV."""
+        for X, y in self.iter_chunks(chunksize):
+            frame = pd.DataFrame(X, columns=self.features)
+            if self.has_labels:
+                frame[self.schema["label_column"]] = y
+            yield frame
+
+    def unique_rows(self):
+        """Deduplicates (symptoms, label) rows without unpacking the whole file.
+
+        Only the 17-byte packed rows are read into memory. Returns unpacked
+        unique rows, their labels and counts for use as sample weights, like
+        training_data.deduplicate.
+        """
+        keys = np.concatenate(
+            [np.asarray(self.packed), np.asarray(self.label_codes).astype("<u2").view(np.uint8).reshape(-1, 2)],
+            axis=1,
+        )
+        first, counts = unique_row_keys(keys)
+        X = np.unpackbits(np.asarray(self.packed[first]), axis=1, count=len(self.features))
+        return X, self._decode(np.asarray(self.label_codes[first])), counts.astype(np.float64)
+
+
+class PackedStore:
+    """A growing labelled dataset kept as a directory of immutable packed segments.
+
+    stage() writes new rows as a segment that this object already reads
+    but other readers ignore until commit(); discard() deletes it instead.
+    Rows are addressed by a global index running over the segments in order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        names = sorted(n for n in os.listdir(path) if n.startswith(SEGMENT_PREFIX) and n.endswith(PACKED_SUFFIX))
+        segments = {n: PackedDataset(os.path.join(path, n)) for n in names}
+        # A compacted segment lists the segments it replaced; any still on
+        # disk are leftovers of an interrupted compact().
+        replaced = {r for segment in segments.values() for r in segment.schema.get("replaces", [])}
+        self.segments = [segments[n] for n in names if n not in replaced]
+        self._staged = []
+        self._index_segments()
+
+    def _index_segments(self):
+        self.features = self.segments[0].features if self.segments else None
+        self.offsets = np.cumsum([0] + [len(s) for s in self.segments])
+        labels = {}
+        for segment in self.segments:
+            for label in segment.classes:
+                labels.setdefault(label, len(labels))
+        self.classes = np.asarray(list(labels), dtype=object)
+        # Per segment: its label codes -> store-wide codes.
+        self._code_maps = [np.array([labels[c] for c in segment.classes], dtype=np.uint16) for segment in self.segments]
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _next_name(self):
+        numbers = [int(os.path.basename(s.path)[len(SEGMENT_PREFIX):].split(".")[0]) for s in self.segments]
+        return f"{SEGMENT_PREFIX}{max(numbers, default=0) + 1:06d}{PACKED_SUFFIX}"
+
+    def stage(self, X, labels, features):
+        """Writes rows as a new staged segment; returns its row count."""
+        features = [str(f) for f in features]
+        if self.features is not None and self.features != features:
+            raise ValueError(f"{self.path} has a different feature order than the rows being added.")
+        final_path = os.path.join(self.path, self._next_name())
+        staged_path = final_path + STAGED_SUFFIX
+        n_rows = write_rows(staged_path, X, labels, features)
+        self.segments.append(PackedDataset(staged_path))
+        self._staged.append((staged_path, final_path))
+        self._index_segments()
+        return n_rows
+
+    def commit(self):
+        """Makes the staged segments part of the store for every reader."""
+        staged = set(path for path, _ in self._staged)
+        keep = [s for s in self.segments if s.path not in staged]
+        # Drop the memory maps first; Windows cannot rename a mapped file.
+        self.segments = keep
+        for staged_path, final_path in self._staged:
+            os.replace(staged_path, final_path)
+            self.segments.append(PackedDataset(final_path))
+        self._staged = []
+        self._index_segments()
+
+    def discard(self):
+        """Deletes the staged segments."""
+        staged = set(path for path, _ in self._staged)
+        self.segments = [s for s in self.segments if s.path not in staged]
+        for staged_path in staged:
+            os.remove(staged_path)
+        self._staged = []
+        self._index_segments()
+
+    def append(self, X, labels, features):
+        n_rows = self.stage(X, labels, features)
+        self.commit()
+        return n_rows
+
+    def label_codes(self):
+        """Store-wide label code of every row, indexing self.classes (NO_LABEL = none)."""
+        codes = np.full(len(self), NO_LABEL, dtype=np.uint16)
+        for segment, code_map, start in zip(self.segments, self._code_maps, self.offsets):
+            local = np.asarray(segment.label_codes)
+            known = local != NO_LABEL
+            codes[start:start + len(local)][known] = code_map[local[known]]
+        return codes
+
+    def label_counts(self):
+        """Rows per label, as a Series indexed by label."""
+        counts, _ = self.symptom_counts(self.classes)
+        return pd.Series(counts, index=self.classes)
+
+    def symptom_counts(self, classes):
+        """Rows per class and symptom counts per class, shape (classes,) and (classes, features).
+
+        Read from the segment schemas; only segments without recorded counts
+        are scanned.
+        """
+        position = {label: i for i, label in enumerate(classes)}
+        totals = np.zeros(len(classes))
+        counts = np.zeros((len(classes), len(self.features or [])))
+        for segment in self.segments:
+            if "symptom_counts" in segment.schema:
+                seg_totals = np.asarray(segment.schema["label_counts"], dtype=np.float64)
+                seg_counts = np.asarray(segment.schema["symptom_counts"], dtype=np.float64).reshape(-1, len(segment.features))
+            else:
+                codes = np.asarray(segment.label_codes)
+                seg_totals = np.bincount(codes[codes != NO_LABEL], minlength=len(segment.classes)).astype(np.float64)
+                seg_counts = np.zeros((len(segment.classes), len(segment.features)))
+                for start in range(0, len(segment), 100000):
+                    X = segment.unpack(start, start + 100000)
+                    chunk = codes[start:start + 100000]
+                    for c in range(len(segment.classes)):
+                        seg_counts[c] += X[chunk == c].sum(axis=0)
+            for seg_row, label in enumerate(segment.classes):
+                row = position.get(label)
+                if row is not None:
+                    totals[row] += seg_totals[seg_row]
+                    counts[row] += seg_counts[seg_row]
+        return totals, counts
+
+    def take(self, indices):
+        """Unpacked rows and labels at the given global indices, in ascending index order."""
+        indices = np.sort(np.asarray(indices, dtype=np.intp))
+        segment_of = np.searchsorted(self.offsets, indices, side="right") - 1
+        X, y = [], []
+        for i in np.unique(segment_of):
+            segment = self.segments[i]
+            local = indices[segment_of == i] - self.offsets[i]
+            X.append(np.unpackbits(segment.packed[local], axis=1, count=len(self.features)))
+            y.append(segment._decode(np.asarray(segment.label_codes[local])))
+        if not X:
+            return np.zeros((0, len(self.features or [])), dtype=np.uint8), np.array([], dtype=object)
+        return np.concatenate(X), np.concatenate(y)
+
+    def unique_rows(self):
+        """Deduplicated (symptoms, label) rows with counts, like PackedDataset.unique_rows."""
+        if not self.segments:
+            return np.zeros((0, 0), dtype=np.uint8), np.array([], dtype=object), np.zeros(0)
+        keys = np.concatenate([np.asarray(s.packed) for s in self.segments])
+        codes = self.label_codes().astype("<u2").view(np.uint8).reshape(-1, 2)
+        first, counts = unique_row_keys(np.concatenate([keys, codes], axis=1))
+        X, y = self.take(first)
+        return X, y, counts.astype(np.float64)
+
+    def compact(self):
+        """Merges all committed segments into one (staged segments are left alone)."""
+        if self._staged:
+            raise ValueError("Commit or discard staged rows before compacting.")
+        if len(self.segments) < 2:
+            return
+        old = self.segments
+        totals, counts = self.symptom_counts(self.classes)
+        schema = {
+            "features": self.features,
+            "labels": self.classes.tolist(),
+            "label_column": old[0].schema.get("label_column", "prognosis"),
+            "n_rows": len(self),
+            "row_bytes": old[0].row_bytes,
+            "source": None,
+            "label_counts": totals.astype(np.int64).tolist(),
+            "symptom_counts": counts.astype(np.int64).tolist(),
+            "replaces": [os.path.basename(s.path) for s in old],
+        }
+        path = os.path.join(self.path, self._next_name())
+        _write_packed(path, np.concatenate([np.asarray(s.packed) for s in old]), self.label_codes(), schema)
+        old_paths = [s.path for s in old]
+        del old
+        self.segments = [PackedDataset(path)]
+        self._index_segments()
+        for old_path in old_paths:
+            os.remove(old_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a symptom CSV to the bit-packed .dxb format.")
+    parser.add_argument("input", help="CSV laid out like Training.csv")
+    parser.add_argument("output", nargs="?", help=f"defaults to the input name with {PACKED_SUFFIX}")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + PACKED_SUFFIX
+    rows = convert_csv(args.input, output, args.chunksize)
+    print(f"✅ Packed {rows} rows into {output} ({os.path.getsize(output) / 1024:.0f} KiB, was {os.path.getsize(args.input) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
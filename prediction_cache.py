@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+
+# --- Shared Prediction Cache ---
+# Process-wide LRU cache of analysis results keyed by the canonical symptom
+# set (a bitset over the model's feature order). The whole input space is a
+# subset of ~132 symptoms and real traffic concentrates on a few hundred
+# combinations, so most clicks can skip predict_proba, ranking and the
+# medications lookup entirely. Entries are dropped automatically when the
+# model file on disk changes.
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def symptom_bitset(symptoms, features):
+    """Encodes a symptom collection as an int with one bit per model feature."""
+    position = {name: i for i, name in enumerate(features)}
+    bits = 0
+    for s in symptoms:
+        if s in position:
+            bits |= 1 << position[s]
+    return bits
+
+
+def file_signature(path):
+    """Cheap change detector for a file: (mtime_ns, size), or None if missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, model_path=None):
+        self.maxsize = max(0, int(maxsize))
+        self.model_path = model_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature = file_signature(model_path) if model_path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_model(self):
+        # Called with the lock held.
+        if self.model_path is None:
+            return
+        signature = file_signature(self.model_path)
+        if signature != self._signature:
+            self._signature = signature
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        """Returns the cached value or None, refreshing its LRU position."""
+        with self._lock:
+            self._check_model()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            if self.maxsize == 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, computing and storing it on a miss.
+
+        `compute` runs outside the lock so a slow prediction never blocks
+        other sessions; two sessions missing on the same key at once simply
+        both compute it.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
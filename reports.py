@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from fpdf import FPDF
+
+# --- PDF Reports ---
+# Report layout shared by the app and the bulk generator. The app renders a
+# report at most once per distinct results object: reports are keyed by a
+# hash of their content and the bytes are kept in a bounded LRU cache, so
+# reruns and repeated downloads reuse them. The bulk mode renders a batch of
+# analysis results on a process pool and streams the PDFs into a zip.
+
+DEFAULT_REPORT_CACHE_SIZE = 128
+DEFAULT_CHUNKSIZE = 16
+
+
+class PDF(FPDF):
+    """PDF generation class for creating the final report."""
+    def __init__(self, name="User", age="N/A"): # NEW: Accept user details
+        super().__init__()
+        self.user_name = name
+        self.user_age = age
+
+    def header(self):
+        self.set_font('Arial', 'B', 15)
+        # NEW: Personalized title
+        self.cell(0, 10, f'DiagnoX AI Report for {self.user_name}', 0, 1, 'C')
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+        self.cell(0, 10, f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 0, 'R')
+
+    def chapter_title(self, title):
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 10, title, 0, 1, 'L')
+        self.ln(4)
+
+    def chapter_body(self, body):
+        self.set_font('Arial', '', 11)
+        self.multi_cell(0, 5, body, new_x="LMARGIN", new_y="NEXT")
+        self.ln()
+
+    def add_diagnosis(self, diagnosis, probability):
+        self.set_font('Arial', 'B', 11)
+        self.cell(95, 8, f" {diagnosis}", 1, 0, 'L')
+        self.set_font('Arial', '', 11)
+        self.cell(95, 8, f"{probability*100:.2f}% Confidence", 1, 1, 'R')
+
+
+def create_pdf_report(results):
+    """Generates a PDF report from the analysis results."""
+    # NEW: Pass user details to PDF class
+    pdf = PDF(name=results['user_name'], age=results['user_age'])
+    pdf.add_page()
+
+    pdf.chapter_title("Patient Input Summary")
+    # NEW: Include all user details in PDF body
+    pdf.chapter_body(f"Name: {results['user_name']}\n"
+                     f"Age: {results['user_age']}\n"
+                     f"Symptom Severity: {results['severity']}\n"
+                     f"Selected Symptoms: {', '.join([s.replace('_', ' ').title() for s in results['selected_symptoms']])}")
+
+    if results['severity'] == 'Severe':
+        pdf.set_text_color(255, 0, 0)
+        # The core PDF fonts are Latin-1 only, so no warning emoji here.
+        pdf.chapter_body("WARNING: Symptoms were marked as SEVERE. Seek immediate medical attention.")
+        pdf.set_text_color(0, 0, 0)
+
+    pdf.chapter_title("Differential Diagnosis Results")
+    for i, pred in enumerate(results['top_predictions']):
+        pdf.add_diagnosis(f"{i+1}. {pred['disease']}", pred['probability'])
+    pdf.ln(5)
+
+    pdf.chapter_title("Detailed Recommendations")
+    for i, pred in enumerate(results['top_predictions']):
+        pdf.set_font('Arial', 'B', 11)
+        pdf.cell(0, 10, f"{i+1}. {pred['disease']}", 0, 1, 'L')
+        for suggestion in pred['suggestions']:
+            pdf.set_font('Arial', '', 11)
+            # fpdf2 leaves the cursor right of a multi_cell by default.
+            pdf.multi_cell(0, 5, f" - {suggestion}", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(3)
+
+    # Lay the document out once; fpdf2 returns a bytearray.
+    return bytes(pdf.output())
+
+
+def report_key(results):
+    """Content hash of everything that ends up in the report."""
+    blob = json.dumps(results, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """Thread-safe LRU cache of rendered PDF bytes, bounded by entries and bytes."""
+
+    def __init__(self, maxsize=DEFAULT_REPORT_CACHE_SIZE, max_bytes=64 * 2**20):
+        self.maxsize = max(0, int(maxsize))
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    def get_or_render(self, results, key=None):
+        """Returns the PDF for `results`, rendering it only on a cache miss."""
+        key = key or report_key(results)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        pdf_bytes = create_pdf_report(results)
+        with self._lock:
+            self.renders += 1
+            if self.maxsize == 0 or key in self._entries:
+                return pdf_bytes
+            self._entries[key] = pdf_bytes
+            self.nbytes += len(pdf_bytes)
+            while self._entries and (len(self._entries) > self.maxsize or self.nbytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+                self.evictions += 1
+        return pdf_bytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "nbytes": self.nbytes,
+                "hits": self.hits,
+                "renders": self.renders,
+                "evictions": self.evictions,
+            }
+
+
+def report_filename(results, index):
+    """Zip member name for one report, unique within the archive."""
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", str(results.get("user_name", "patient"))).strip("_") or "patient"
+    return f"{index:06d}_DiagnoX_Report_{name}.pdf"
+
+
+def _render_chunk(start, chunk):
+    return [(report_filename(results, start + i), create_pdf_report(results)) for i, results in enumerate(chunk)]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_reports_zip(results_iter, destination, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Renders every results dict into one zip, in input order. Returns the count.
+
+    `destination` is a path or a writable binary stream; zipfile handles
+    unseekable streams (e.g. an HTTP response) by writing data descriptors.
+    Only a few chunks per worker are in flight at once, so the input can be
+    a generator over far more results than fit in memory. PDFs are already
+    compressed, so members are stored rather than deflated.
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_STORED) as archive:
+        def write(rendered):
+            nonlocal count
+            for name, pdf_bytes in rendered:
+                archive.writestr(name, pdf_bytes)
+                count += 1
+
+        if workers == 1:
+            for chunk in _chunks(results_iter, chunksize):
+                write(_render_chunk(count, chunk))
+            return count
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            start = 0
+            for chunk in _chunks(results_iter, chunksize):
+                pending.append(pool.submit(_render_chunk, start, chunk))
+                start += len(chunk)
+                if len(pending) >= 4 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    return count
+
+
+def read_results(path):
+    """Yields analysis results from a JSON Lines file (one results dict per line)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render DiagnoX PDF reports in bulk into a zip archive.")
+    parser.add_argument("input", help="JSON Lines file of analysis results, laid out like the app's session results")
+    parser.add_argument("output", help="zip file to write, or - for stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="reports sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    destination = sys.stdout.buffer if args.output == "-" else args.output
+    count = write_reports_zip(read_results(args.input), destination, args.workers, args.chunksize)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Rendered {count} reports in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s) on {args.workers} workers",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from attribution import PathAttributor, explain_selection
+from forest_compression import merge_subtrees, rebuild, shrink_dtypes
+from forest_engine import FlatForest
+
+FEATURES = [f"symptom_{i}" for i in range(12)]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = (rng.random((300, len(FEATURES))) < 0.3).astype(np.uint8)
+    # Labels follow a few symptoms, with some noise so the trees grow deep.
+    has = X.astype(bool)
+    y = np.select([has[:, 0] & has[:, 1], has[:, 2], has[:, 3] | has[:, 4]], ["flu", "cold", "allergy"], "healthy")
+    flip = rng.random(len(y)) < 0.1
+    y[flip] = rng.choice(["flu", "cold", "allergy", "healthy"], flip.sum())
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def model(data):
+    X, y = data
+    return RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+
+
+def assert_adds_up(attributor, X, proba, atol):
+    for x, p in zip(X, proba):
+        assert np.allclose(attributor.baseline + attributor.explain(x).sum(axis=0), p, rtol=0, atol=atol)
+
+
+def test_explain_adds_up_to_predict_proba(model, data):
+    X, _ = data
+    attributor = PathAttributor.from_model(model)
+    assert attributor.explain(X[0]).shape == (len(FEATURES), len(model.classes_))
+    assert_adds_up(attributor, X[:50], model.predict_proba(X[:50]), atol=1e-12)
+
+
+def test_explain_batch_matches_explain(model, data):
+    X, _ = data
+    attributor = PathAttributor.from_model(model)
+    batch = np.concatenate([X[:40], X[:10]])  # repeated rows are walked once
+    proba = model.predict_proba(batch)
+    top = proba.argmax(axis=1)
+    baselines, contributions = attributor.explain_batch(batch, top, chunk_rows=16)
+    assert contributions.shape == (len(batch), len(FEATURES))
+    assert np.allclose(baselines + contributions.sum(axis=1), proba[np.arange(len(batch)), top], rtol=0, atol=1e-12)
+    for x, c, row in zip(batch, top, contributions):
+        assert np.allclose(row, attributor.explain(x)[:, c], rtol=0, atol=1e-12)
+
+
+def test_explain_selection_splits_present_and_absent(model):
+    attributor = PathAttributor.from_model(model)
+    selected = ["symptom_0", "symptom_1"]
+    x = np.isin(FEATURES, selected).astype(np.uint8)
+    proba = model.predict_proba(x[None, :])[0]
+    (explanation,) = explain_selection(attributor, FEATURES, selected, [int(proba.argmax())])
+    symptoms = sum(s["contribution"] for s in explanation["symptoms"])
+    assert {s["symptom"] for s in explanation["symptoms"]} == set(selected)
+    assert explanation["probability"] == pytest.approx(proba.max(), abs=1e-12)
+    assert explanation["baseline"] + symptoms + explanation["absent_symptoms"] == pytest.approx(proba.max(), abs=1e-12)
+
+
+@pytest.mark.parametrize("values, atol", [("float64", 1e-12), ("float32", 1e-6), ("uint8", 1e-12)])
+def test_compressed_forest_adds_up(model, data, values, atol):
+    X, _ = data
+    flat = FlatForest.from_sklearn(model)
+    # Drop trees, cap the depth and share subtrees, as forest_compression does.
+    compressed = shrink_dtypes(merge_subtrees(rebuild(flat, flat.roots[:9], max_depth=4)), values)
+    assert compressed.n_estimators == 9
+    attributor = PathAttributor(compressed)
+    proba = compressed.predict_proba(X[:50])
+    assert_adds_up(attributor, X[:50], proba, atol)
+    top = proba.argmax(axis=1)
+    baselines, contributions = attributor.explain_batch(X[:50], top)
+    assert np.allclose(baselines + contributions.sum(axis=1), proba[np.arange(50), top], rtol=0, atol=atol)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from attribution import PathAttributor
+from forest_engine import FlatForest
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(1)
+    X = (rng.random((200, 8)) < 0.4).astype(np.uint8)
+    y = np.where(X[:, 0] & X[:, 1], "flu", np.where(X[:, 2], "cold", "healthy"))
+    return RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+
+
+def test_matches_sklearn(model):
+    X = (np.random.default_rng(2).random((64, 8)) < 0.4).astype(np.uint8)
+    flat = FlatForest.from_sklearn(model)
+    assert np.array_equal(flat.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(flat.predict_proba(X[:1]), model.predict_proba(X[:1]))
+
+
+@pytest.mark.parametrize("width", [3, 9, 100])
+@pytest.mark.parametrize("rows", [1, 3])
+def test_rejects_wrong_width(model, width, rows):
+    flat = FlatForest.from_sklearn(model)
+    attributor = PathAttributor(flat)
+    X = np.ones((rows, width), dtype=np.uint8)
+    message = f"X has {width} features, but the forest is expecting 8"
+    with pytest.raises(ValueError, match=message):
+        flat.predict_proba(X)
+    with pytest.raises(ValueError, match=message):
+        flat.apply(X)
+    with pytest.raises(ValueError, match=message):
+        attributor.explain(X[0])
+    with pytest.raises(ValueError, match=message):
+        attributor.explain_batch(X, np.zeros(rows, dtype=int))
@@ -0,0 +1,73 @@
+import sqlite3
+import threading
+
+from history_store import HistoryStore
+
+FEATURES = ["fever", "cough", "headache"]
+PREDICTIONS = [{"disease": "flu", "probability": 0.8}, {"disease": "cold", "probability": 0.2}]
+
+
+def make_store(tmp_path, **kwargs):
+    return HistoryStore(str(tmp_path / "history.db"), flush_seconds=0.01, retry_seconds=0.01, **kwargs)
+
+
+def fail_first(store, failures):
+    """Makes the next `failures` transactions fail as if the database were locked."""
+    apply, calls = store._apply, []
+
+    def flaky(conn, ops):
+        calls.append(len(ops))
+        if len(calls) <= failures:
+            raise sqlite3.OperationalError("database is locked")
+        return apply(conn, ops)
+
+    store._apply = flaky
+    return calls
+
+
+def test_locked_batches_are_retried_not_dropped(tmp_path):
+    store = make_store(tmp_path)
+    calls = fail_first(store, 2)
+    for i in range(5):
+        store.record("s1", FEATURES, 0b011, "Mild", PREDICTIONS, created_at=1_700_000_000 + i)
+    assert store.flush(timeout=10)
+    assert len(calls) >= 3
+    assert store.stats()["written"] == 5 and store.stats()["dropped"] == 0
+    rows, _ = store.page("s1", limit=10)
+    assert len(rows) == 5
+    assert store.pending("s1") == []
+
+
+def test_gives_up_after_the_last_attempt(tmp_path):
+    store = make_store(tmp_path, write_attempts=3)
+    fail_first(store, 3)
+    store.record("s1", FEATURES, 0b001, "Mild", PREDICTIONS)
+    assert store.flush(timeout=10)
+    assert store.stats()["dropped"] == 1 and store.stats()["written"] == 0
+    assert store.pending("s1") == []
+    # The writer keeps going afterwards.
+    store.record("s1", FEATURES, 0b001, "Mild", PREDICTIONS)
+    assert store.flush(timeout=10)
+    assert store.stats()["written"] == 1
+
+
+def test_counters_are_consistent_under_concurrent_drops(tmp_path):
+    store = make_store(tmp_path, queue_size=1)
+    gate = threading.Event()
+    apply = store._apply
+    store._apply = lambda conn, ops: (gate.wait(), apply(conn, ops))[1]
+    accepted = []
+
+    def spam():
+        accepted.append(sum(store.record("s2", FEATURES, 0b100, "Mild", PREDICTIONS) for _ in range(200)))
+
+    threads = [threading.Thread(target=spam) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gate.set()
+    assert store.flush(timeout=10)
+    stats = store.stats()
+    assert stats["written"] == sum(accepted)
+    assert stats["written"] + stats["dropped"] == 800
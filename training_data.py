@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from packed_dataset import PackedDataset, is_packed_path, unique_row_keys
+
+# --- Training Data Preparation ---
+# Loading and preprocessing shared by model_training.py and the benchmarks.
+# Training.csv repeats each symptom vector many times, so identical
+# (symptoms, prognosis) rows are collapsed into one row with a sample weight
+# equal to its count. Fitting on the weighted unique rows sees the same data
+# distribution at a fraction of the size. Every loader accepts either a CSV
+# or a bit-packed .dxb file (see packed_dataset.py).
+
+LABEL_COLUMN = "prognosis"
+DROP_COLUMNS = ["Unnamed: 133"]
+
+
+def load_frame(path):
+    """Reads a symptom CSV or .dxb file into a 0/1 feature frame and labels."""
+    if is_packed_path(path):
+        dataset = PackedDataset(path)
+        X = pd.DataFrame(dataset.unpack(), columns=dataset.features)
+        return X, pd.Series(dataset.labels(), name=LABEL_COLUMN)
+    df = pd.read_csv(path).drop(columns=DROP_COLUMNS, errors="ignore")
+    return df.drop(columns=LABEL_COLUMN), df[LABEL_COLUMN]
+
+
+def load_unique(path):
+    """Loads a training file as weighted unique rows: (X frame, labels, weights).
+
+    Packed files are deduplicated in their packed form, so only the unique
+    rows are ever unpacked.
+    """
+    if is_packed_path(path):
+        dataset = PackedDataset(path)
+        X, y, weights = dataset.unique_rows()
+        return pd.DataFrame(X, columns=dataset.features), pd.Series(y, name=LABEL_COLUMN), weights
+    return deduplicate(*load_frame(path))
+
+
+def deduplicate(X, y):
+    """Collapses identical (symptoms, label) rows.
+
+    Returns the unique rows (first occurrences, in original order), their
+    labels and an array of per-row counts to use as sample weights.
+    """
+    values = np.asarray(X, dtype=np.uint8)
+    labels = np.asarray(y)
+    _, label_codes = np.unique(labels, return_inverse=True)
+
+    # Key each row by its bit-packed symptoms plus a 4-byte label code.
+    keys = np.concatenate(
+        [np.packbits(values, axis=1), label_codes.astype("<u4").view(np.uint8).reshape(-1, 4)],
+        axis=1,
+    )
+    first, counts = unique_row_keys(keys)
+
+    if isinstance(X, pd.DataFrame):
+        X_unique = X.iloc[first].reset_index(drop=True)
+    else:
+        X_unique = values[first]
+    y_unique = y.iloc[first].reset_index(drop=True) if isinstance(y, pd.Series) else labels[first]
+    return X_unique, y_unique, counts.astype(np.float64)